@@ -0,0 +1,215 @@
+"""
+Persistent analysis log backed by SQLite in WAL mode.
+
+Every prediction is queued in memory and written by a background thread in
+batched transactions, so logging never blocks the request path. Raw rows are
+indexed by time and by class for time-range queries; the same transaction
+also folds each batch into per-day and per-month count tables and bumps a
+data version, so the dashboard reads a few hundred rows however many
+analyses are stored, and can skip even that while the version is unchanged.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+ANALYSIS_LOG_PATH = 'analysis_log.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day INTEGER NOT NULL,
+    skin_type TEXT NOT NULL,
+    confidence REAL,
+    latency_ms REAL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_ts ON analyses (ts);
+CREATE INDEX IF NOT EXISTS idx_analyses_type_ts ON analyses (skin_type, ts);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day INTEGER NOT NULL,
+    skin_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    latency_sum REAL NOT NULL,
+    PRIMARY KEY (day, skin_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS monthly_counts (
+    month INTEGER NOT NULL,
+    skin_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (month, skin_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO data_version (id, version) VALUES (0, 0);
+"""
+
+UPSERT_DAILY = """
+INSERT INTO daily_counts (day, skin_type, count, confidence_sum, latency_sum)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (day, skin_type) DO UPDATE SET
+    count = count + excluded.count,
+    confidence_sum = confidence_sum + excluded.confidence_sum,
+    latency_sum = latency_sum + excluded.latency_sum
+"""
+
+UPSERT_MONTHLY = """
+INSERT INTO monthly_counts (month, skin_type, count) VALUES (?, ?, ?)
+ON CONFLICT (month, skin_type) DO UPDATE SET count = count + excluded.count
+"""
+
+BACKFILL = """
+INSERT INTO daily_counts (day, skin_type, count, confidence_sum, latency_sum)
+SELECT day, skin_type, COUNT(*), TOTAL(confidence), TOTAL(latency_ms)
+FROM analyses GROUP BY day, skin_type;
+INSERT INTO monthly_counts (month, skin_type, count)
+SELECT day / 100, skin_type, SUM(count) FROM daily_counts GROUP BY day / 100, skin_type;
+UPDATE data_version SET version = version + 1;
+"""
+
+
+def day_key(ts):
+    """YYYYMMDD integer for a unix timestamp (local time)"""
+    d = datetime.fromtimestamp(ts)
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+class AnalysisLog:
+    def __init__(self, path=ANALYSIS_LOG_PATH, batch_size=256, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        # Databases written before the rollups existed are backfilled once
+        if conn.execute('SELECT NOT EXISTS (SELECT 1 FROM monthly_counts)').fetchone()[0]:
+            conn.executescript('BEGIN; DELETE FROM daily_counts;' + BACKFILL + 'COMMIT;')
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name='analysis-log-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        """One read connection per thread (Streamlit reruns run on several threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def record(self, skin_type, confidence=None, latency_ms=None, model_version=None, ts=None):
+        """Queue one analysis; returns immediately"""
+        ts = time.time() if ts is None else ts
+        self._queue.put((ts, day_key(ts), skin_type, confidence, latency_ms, model_version))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Collect more rows until the batch is full or the interval passed
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    self._write(conn, rows)
+                except sqlite3.Error as e:
+                    print(f"Analysis log write failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn, rows):
+        # Rollups are updated incrementally from the batch, never recomputed
+        daily, monthly = {}, {}
+        for _, day, skin_type, confidence, latency_ms, _ in rows:
+            totals = daily.setdefault((day, skin_type), [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += confidence or 0.0
+            totals[2] += latency_ms or 0.0
+            month = (day // 100, skin_type)
+            monthly[month] = monthly.get(month, 0) + 1
+        with conn:
+            conn.executemany(
+                'INSERT INTO analyses (ts, day, skin_type, confidence, latency_ms, model_version) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+            conn.executemany(UPSERT_DAILY, [key + tuple(totals) for key, totals in daily.items()])
+            conn.executemany(UPSERT_MONTHLY, [key + (count,) for key, count in monthly.items()])
+            conn.execute('UPDATE data_version SET version = version + 1')
+
+    def flush(self):
+        """Block until every queued analysis is written"""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+
+    def _day_range(self, start=None, end=None):
+        return (day_key(start) if start is not None else 0,
+                day_key(end) if end is not None else 99999999)
+
+    def data_version(self):
+        """Counter bumped by every committed batch; cache keys for derived views"""
+        return self._reader().execute('SELECT version FROM data_version').fetchone()[0]
+
+    def total(self, start=None, end=None):
+        first, last = self._day_range(start, end)
+        return self._reader().execute(
+            'SELECT COALESCE(SUM(count), 0) FROM daily_counts WHERE day BETWEEN ? AND ?', (first, last)
+        ).fetchone()[0]
+
+    def class_distribution(self, start=None, end=None):
+        """{skin_type: count} between two timestamps (inclusive days)"""
+        first, last = self._day_range(start, end)
+        rows = self._reader().execute(
+            'SELECT skin_type, SUM(count) FROM daily_counts WHERE day BETWEEN ? AND ? GROUP BY skin_type',
+            (first, last)
+        ).fetchall()
+        return dict(rows)
+
+    def monthly_trend(self, start=None, end=None):
+        """[(YYYY-MM, skin_type, count)] ordered by month"""
+        first, last = self._day_range(start, end)
+        if start is None and end is None:
+            rows = self._reader().execute(
+                'SELECT month, skin_type, count FROM monthly_counts ORDER BY month, skin_type'
+            ).fetchall()
+        else:
+            rows = self._reader().execute(
+                'SELECT day / 100 AS month, skin_type, SUM(count) FROM daily_counts '
+                'WHERE day BETWEEN ? AND ? GROUP BY month, skin_type ORDER BY month, skin_type',
+                (first, last)
+            ).fetchall()
+        return [(f"{month // 100:04d}-{month % 100:02d}", skin_type, count) for month, skin_type, count in rows]
@@ -1,12 +1,186 @@
 """
 Script otomatis untuk setup sistem klasifikasi dengan file yang sudah diupload
+
+Setup berjalan sebagai pipeline bertahap (konfigurasi, dataset, fitur,
+training). Setiap tahap punya fingerprint dari input-nya yang disimpan di
+setup_state.json; tahap yang input-nya tidak berubah sejak run terakhir yang
+berhasil dilewati, sehingga restart tanpa perubahan langsung menjalankan
+aplikasi tanpa training ulang.
 """
+import argparse
+import hashlib
+import json
+import os
 import subprocess
 import sys
-import os
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = 'setup_state.json'
+
+# Konfigurasi training; perubahan di sini memicu training ulang
+TRAINING_CONFIG = {
+    'feature_engine': 'pixels',
+    'measurement_source': 'image',
+    'n_components': None,
+    'top_k': None,
+    'backend': 'random_forest',
+}
+
+# Kode yang menentukan hasil tiap tahap
+FEATURE_CODE = ['face_classification_model.py', 'feature_store.py', 'color_features.py',
+                'skin_measurements.py']
+TRAINING_CODE = ['face_classification_model.py']
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha1 isi file"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts):
+    """Hash stabil dari nilai apa pun yang bisa di-JSON-kan"""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
 
-def run_setup():
+def code_digest(names):
+    return {name: file_digest(os.path.join(SCRIPTS_DIR, name)) for name in names}
+
+
+def artifact_stats(paths):
+    """(ukuran, mtime) artifact; None kalau belum ada"""
+    stats = {}
+    for path in paths:
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        stats[path] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+class SetupPipeline:
+    def __init__(self, urls, state_path=STATE_PATH, force=False):
+        self.urls = urls
+        self.state_path = state_path
+        self.force = force
+        self.state = {}
+        if not force and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+        self.data = None
+    
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+    
+    def stage(self, number, name, inputs, run):
+        """Jalankan `run` kalau fingerprint `inputs()` berbeda dari run terakhir yang berhasil
+        
+        Fingerprint dihitung ulang setelah `run`, karena tahap seperti update
+        konfigurasi mengubah input-nya sendiri.
+        """
+        start = time.perf_counter()
+        current = inputs()
+        if current is not None and self.state.get(name) == current:
+            print(f"{number} {name}: tidak berubah, dilewati")
+            return False
+        
+        print(f"{number} {name}: menjalankan...")
+        run()
+        self.state[name] = inputs()
+        self._save_state()
+        print(f"   ✅ selesai dalam {time.perf_counter() - start:.1f}s")
+        return True
+    
+    # Tahap 1: konfigurasi URL
+    def config_inputs(self):
+        from config_updater import ConfigUpdater
+        
+        files = [path for path in ConfigUpdater().files_to_update if os.path.exists(path)]
+        return fingerprint(self.urls, {path: file_digest(path) for path in files},
+                           code_digest(['config_updater.py']))
+    
+    def run_config(self):
+        result = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'config_updater.py')],
+                                input='y\n', text=True, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"config_updater gagal: {result.stderr.strip()}")
+    
+    # Tahap 2: dataset (diunduh ulang hanya kalau ETag di server berubah)
+    def fetch_dataset(self):
+        from model_management import CsvPreview
+        
+        self.csv_path = CsvPreview(self.urls['csv'], sample_rows=1).complete()
+        stat = os.stat(self.csv_path)
+        cached = self.state.get('dataset_file', {})
+        # Hash isi hanya dihitung ulang kalau file cache berubah
+        if cached.get('stat') != [stat.st_size, stat.st_mtime_ns] or cached.get('path') != self.csv_path:
+            cached = {'path': self.csv_path, 'stat': [stat.st_size, stat.st_mtime_ns],
+                      'sha1': file_digest(self.csv_path)}
+            self.state['dataset_file'] = cached
+            self._save_state()
+        self.dataset_hash = cached['sha1']
+        print(f"   📊 Dataset {self.csv_path} (sha1 {self.dataset_hash[:12]})")
+    
+    # Tahap 3: fitur
+    def features_inputs(self):
+        return fingerprint(self.dataset_hash, code_digest(FEATURE_CODE),
+                           TRAINING_CONFIG['feature_engine'], TRAINING_CONFIG['measurement_source'])
+    
+    def classifier(self):
+        from face_classification_model import JiabaoFaceClassifier
+        
+        return JiabaoFaceClassifier(feature_engine=TRAINING_CONFIG['feature_engine'],
+                                    measurement_source=TRAINING_CONFIG['measurement_source'],
+                                    n_components=TRAINING_CONFIG['n_components'],
+                                    backend=TRAINING_CONFIG['backend'])
+    
+    def build_features(self):
+        # load_data mengisi feature store; hasilnya dipakai langsung oleh training
+        self.data = self.classifier().load_data(self.csv_path)
+    
+    # Tahap 4: training dan artifact model
+    def training_inputs(self):
+        from face_classification_model import MODEL_PATH, PIPELINE_PATH, SCALER_PATH
+        
+        artifacts = artifact_stats([MODEL_PATH, SCALER_PATH, PIPELINE_PATH])
+        if artifacts is None:
+            return None
+        return fingerprint(self.state.get('features'), TRAINING_CONFIG, code_digest(TRAINING_CODE), artifacts)
+    
+    def train(self):
+        classifier = self.classifier()
+        if self.data is None:
+            self.data = classifier.load_data(self.csv_path)
+        X, y = self.data
+        if TRAINING_CONFIG['top_k'] is None:
+            accuracy = classifier.fit(X, y)
+        else:
+            accuracy = classifier.fit_pruned(X, y, TRAINING_CONFIG['top_k'])
+        print(f"   🎯 Akurasi: {accuracy:.1%}")
+    
+    def run(self):
+        self.stage("1️⃣", 'config', self.config_inputs, self.run_config)
+        
+        print("2️⃣ dataset: memeriksa...")
+        self.fetch_dataset()
+        
+        self.stage("3️⃣", 'features', self.features_inputs, self.build_features)
+        self.stage("4️⃣", 'training', self.training_inputs, self.train)
+
+
+def run_setup(force=False, launch=True):
     """Jalankan setup otomatis dengan file user"""
+    start = time.perf_counter()
     print("🚀 Jiabao Klinik - Auto Setup")
     print("=" * 50)
     
@@ -25,37 +199,32 @@ def run_setup():
     print("\n🔄 Memulai setup...")
     
     try:
-        # 1. Update konfigurasi
-        print("1️⃣ Mengupdate konfigurasi URL...")
-        result = subprocess.run([sys.executable, 'scripts/config_updater.py'], 
-                              input='y\n', text=True, capture_output=True)
-        if result.returncode == 0:
-            print("   ✅ Konfigurasi berhasil diupdate")
-        else:
-            print("   ⚠️ Warning pada update konfigurasi")
-        
-        # 2. Train model dengan data baru
-        print("2️⃣ Melatih model dengan dataset baru...")
-        result = subprocess.run([sys.executable, 'scripts/face_classification_model.py'], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
-            print("   ✅ Model berhasil dilatih")
-        else:
-            print("   ⚠️ Warning pada training model")
+        SetupPipeline(urls, force=force).run()
+        print(f"\n⏱️ Setup selesai dalam {time.perf_counter() - start:.1f}s")
+        
+        if not launch:
+            return
         
-        # 3. Jalankan aplikasi
-        print("3️⃣ Memulai aplikasi Streamlit...")
+        # 5. Jalankan aplikasi
+        print("5️⃣ Memulai aplikasi Streamlit...")
         print("🌐 Aplikasi akan terbuka di browser...")
         print("📱 URL: http://localhost:8501")
         
         subprocess.run([sys.executable, '-m', 'streamlit', 'run', 'scripts/streamlit_face_app.py'])
-        
+    
     except Exception as e:
         print(f"❌ Error: {e}")
         print("🔧 Coba jalankan manual:")
         print("   1. python scripts/config_updater.py")
-        print("   2. python scripts/face_classification_model.py") 
+        print("   2. python scripts/face_classification_model.py")
         print("   3. streamlit run scripts/streamlit_face_app.py")
 
+def main():
+    parser = argparse.ArgumentParser(description="Jiabao Klinik - Auto Setup")
+    parser.add_argument('--force', action='store_true', help='jalankan ulang semua tahap')
+    parser.add_argument('--no-app', action='store_true', help='jangan jalankan Streamlit setelah setup')
+    args = parser.parse_args()
+    run_setup(force=args.force, launch=not args.no_app)
+
 if __name__ == "__main__":
-    run_setup()
+    main()
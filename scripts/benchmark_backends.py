@@ -0,0 +1,60 @@
+"""
+Compare estimator backends on the same dataset: fit time, predict latency, model size and accuracy
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+from face_classification_model import JiabaoFaceClassifier, BACKENDS
+
+
+def predict_latency_ms(classifier, X_scaled, repeats=50, batch_size=64):
+    """Median single-row and per-row batch predict_proba latency, in milliseconds"""
+    single = []
+    for i in range(repeats):
+        row = X_scaled[i % len(X_scaled)][None, :]
+        start = time.perf_counter()
+        classifier.model.predict_proba(row)
+        single.append(time.perf_counter() - start)
+
+    batch = X_scaled[:batch_size]
+    batched = []
+    for _ in range(max(repeats // 10, 3)):
+        start = time.perf_counter()
+        classifier.model.predict_proba(batch)
+        batched.append((time.perf_counter() - start) / len(batch))
+    return float(np.median(single)) * 1000, float(np.median(batched)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('csv', help='dataset CSV (URL or local path)')
+    parser.add_argument('--zip', default=None, help='optional photo ZIP to build pixels from')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--n-components', type=int, default=None, help='optional PCA stage for every backend')
+    args = parser.parse_args()
+
+    # Features are built once; every backend fits on the same split
+    X, y = JiabaoFaceClassifier().load_data(args.csv, args.zip)
+
+    results = []
+    for backend in args.backends:
+        classifier = JiabaoFaceClassifier(backend=backend, n_components=args.n_components)
+        start = time.perf_counter()
+        accuracy = classifier.fit(X, y, save=False)
+        fit_time = time.perf_counter() - start
+
+        _, X_test, _, _ = classifier._split(X.fillna(X.mean()), y)
+        single_ms, batch_ms = predict_latency_ms(classifier, classifier.transform(X_test))
+        size = len(pickle.dumps(classifier.model)) / 1024 / 1024
+        results.append((backend, fit_time, single_ms, batch_ms, size, accuracy))
+
+    print(f"\n{'backend':>24} {'fit s':>8} {'1-row ms':>9} {'batch ms/row':>13} {'size MB':>8} {'accuracy':>9}")
+    for backend, fit_time, single_ms, batch_ms, size, accuracy in results:
+        print(f"{backend:>24} {fit_time:>8.2f} {single_ms:>9.3f} {batch_ms:>13.4f} {size:>8.2f} {accuracy:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare the raw pixel and colour-histogram feature engines
+"""
+import argparse
+import io
+import pickle
+import time
+
+import numpy as np
+from PIL import Image
+
+from face_classification_model import JiabaoFaceClassifier, FEATURE_ENGINES
+
+
+def serving_extraction_ms(classifier, image_bytes, repeats=50):
+    """Median per-image feature extraction time at serving, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        classifier.extract_features_from_image(io.BytesIO(image_bytes))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('csv', help='dataset CSV (URL or local path)')
+    parser.add_argument('--zip', default=None, help='optional photo ZIP to build pixels from')
+    parser.add_argument('--engines', nargs='+', choices=FEATURE_ENGINES, default=list(FEATURE_ENGINES))
+    args = parser.parse_args()
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.random.default_rng(42).integers(0, 256, (480, 640, 3), dtype=np.uint8)).save(buffer, 'JPEG')
+    image_bytes = buffer.getvalue()
+
+    results = []
+    for engine in args.engines:
+        classifier = JiabaoFaceClassifier(feature_engine=engine)
+        start = time.perf_counter()
+        X, y = classifier.load_data(args.csv, args.zip)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        accuracy = classifier.fit(X, y, save=False)
+        train_time = time.perf_counter() - start
+
+        size = len(pickle.dumps((classifier.model, classifier.scaler))) / 1024 / 1024
+        results.append((engine, X.shape[1], load_time, serving_extraction_ms(classifier, image_bytes),
+                        train_time, size, accuracy))
+
+    print(f"\n{'engine':>10} {'features':>9} {'build s':>8} {'serve ms':>9} {'train s':>8} {'size MB':>8} {'accuracy':>9}")
+    for engine, n_features, load_time, serve_ms, train_time, size, accuracy in results:
+        print(f"{engine:>10} {n_features:>9} {load_time:>8.2f} {serve_ms:>9.3f} {train_time:>8.2f} {size:>8.2f} {accuracy:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark the IncrementalPCA reduction stage across component counts
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+from face_classification_model import JiabaoFaceClassifier
+
+
+def model_size(classifier):
+    """Serialized size in bytes of everything needed at serving time"""
+    return len(pickle.dumps((classifier.model, classifier.scaler, classifier.reducer)))
+
+
+def inference_latency(classifier, rows):
+    """Median single-row latency (scale, reduce, forest) in milliseconds"""
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        classifier.model.predict_proba(classifier.transform(row.reshape(1, -1)))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('csv', help='dataset CSV (URL or local path)')
+    parser.add_argument('--zip', default=None, help='optional photo ZIP to build pixels from')
+    parser.add_argument('--components', type=int, nargs='+', default=[0, 16, 32, 64, 128, 256],
+                        help='component counts to compare; 0 means no reduction stage')
+    parser.add_argument('--latency-samples', type=int, default=50)
+    args = parser.parse_args()
+
+    X, y = JiabaoFaceClassifier().load_data(args.csv, args.zip)
+    rows = X.fillna(X.mean()).to_numpy()[:args.latency_samples]
+
+    results = []
+    for n_components in args.components:
+        classifier = JiabaoFaceClassifier(n_components=n_components or None)
+        start = time.perf_counter()
+        accuracy = classifier.fit(X, y, save=False)
+        train_time = time.perf_counter() - start
+        results.append((n_components, train_time, inference_latency(classifier, rows),
+                        model_size(classifier) / 1024 / 1024, accuracy))
+
+    print(f"\n{'components':>10} {'train s':>9} {'predict ms':>11} {'size MB':>8} {'accuracy':>9}")
+    for n_components, train_time, latency, size, accuracy in results:
+        label = n_components or 'none'
+        print(f"{label:>10} {train_time:>9.2f} {latency:>11.3f} {size:>8.2f} {accuracy:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark importance-driven pruning: accuracy vs k vs serving latency
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from face_classification_model import JiabaoFaceClassifier
+
+
+def serving_latency(classifier, image_bytes, repeats=50):
+    """Median end-to-end latency (decode, gather, scale, forest) in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        features = classifier.extract_features_from_image(io.BytesIO(image_bytes))
+        classifier.model.predict_proba(classifier.transform(features))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('csv', help='dataset CSV (URL or local path)')
+    parser.add_argument('--zip', default=None, help='optional photo ZIP to build pixels from')
+    parser.add_argument('--k', type=int, nargs='+', default=[64, 256, 1024, 4096])
+    parser.add_argument('--importance', choices=['impurity', 'permutation'], default='impurity')
+    args = parser.parse_args()
+
+    base = JiabaoFaceClassifier()
+    X, y = base.load_data(args.csv, args.zip)
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.random.default_rng(42).integers(0, 256, (480, 640, 3), dtype=np.uint8)).save(buffer, 'JPEG')
+    image_bytes = buffer.getvalue()
+
+    results = [('all', base.fit(X, y, save=False), serving_latency(base, image_bytes))]
+    ranking = base.rank_features(X, y, args.importance)
+
+    for k in args.k:
+        classifier = JiabaoFaceClassifier()
+        accuracy = classifier.prune(X, y, k, ranking=ranking, save=False)
+        results.append((k, accuracy, serving_latency(classifier, image_bytes)))
+
+    print(f"\n{'k':>6} {'accuracy':>9} {'serve ms':>9}")
+    for k, accuracy, latency in results:
+        print(f"{k:>6} {accuracy:>9.3f} {latency:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
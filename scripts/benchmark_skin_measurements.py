@@ -0,0 +1,84 @@
+"""
+Benchmark per-image cost of the kadar minyak / kadar air / ukuran pori estimator
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from skin_measurements import estimate_skin_measurements, estimate_from_pixel_rows
+
+
+def time_batch(images, repeats):
+    """Best-of-`repeats` wall time for one batch, in seconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        estimate_skin_measurements(images)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def structured_images(rng, count, size=64):
+    """Smooth shaded images with dark spots, half of them on the top and bottom rows
+
+    Flat or pure-noise images hide filters that leak across stacked images,
+    so the spots are put where a leak would change the pore count.
+    """
+    y, x = np.mgrid[:size, :size] / size
+    edge_rows = [0, 1, 2, size - 3, size - 2, size - 1]
+    images = np.empty((count, size, size, 3), dtype=np.uint8)
+    for i in range(count):
+        base = 120 + 60 * np.sin(rng.uniform(2, 8) * x + rng.uniform(0, 6)) * np.cos(rng.uniform(2, 8) * y)
+        base += rng.normal(0, 2, base.shape)
+        spots = rng.integers(5, 70)
+        rows = np.where(rng.random(spots) < 0.5, rng.choice(edge_rows, spots), rng.integers(0, size, spots))
+        base[rows, rng.integers(0, size, spots)] -= 70
+        images[i] = np.clip(base, 0, 255)[..., None].astype(np.uint8)
+    return images
+
+
+def check_batch_matches_single(images):
+    """Batched (training) and one-at-a-time (serving) estimates must be identical"""
+    batched = estimate_from_pixel_rows(images.reshape(len(images), -1), images.shape[2:0:-1])
+    single = np.vstack([estimate_skin_measurements(image) for image in images])
+    mismatched = np.flatnonzero(~np.isclose(batched, single).all(axis=1))
+    if len(mismatched):
+        print(f"Batched and single-image estimates differ for {len(mismatched)} of {len(images)} images")
+        return False
+    print(f"Batched and single-image estimates match on {len(images)} structured images")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 64, 512])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=1.0,
+                        help='maximum allowed cost per image for a single-image call')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if not check_batch_matches_single(structured_images(rng, 64)):
+        sys.exit(1)
+
+    print(f"{'batch':>6} {'total ms':>10} {'ms/image':>10}")
+
+    single_cost = None
+    for batch_size in args.batch_sizes:
+        images = rng.integers(0, 256, (batch_size, 64, 64, 3), dtype=np.uint8)
+        estimate_skin_measurements(images)  # warm up
+        elapsed = time_batch(images, args.repeats)
+        per_image = elapsed * 1000 / batch_size
+        if batch_size == 1:
+            single_cost = per_image
+        print(f"{batch_size:>6} {elapsed * 1000:>10.3f} {per_image:>10.4f}")
+
+    if single_cost is not None and single_cost > args.budget_ms:
+        print(f"Single-image cost {single_cost:.3f} ms exceeds budget {args.budget_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Cold-start benchmark for each entry point, based on `python -X importtime`.
+
+Every entry point is imported in a fresh interpreter several times; the
+fastest run is kept. Results are compared with a stored baseline and the
+script exits non-zero when an entry point got slower than the tolerance.
+
+Runs happen in an empty temporary working directory, so nothing is written
+into the source tree and the result does not depend on which model files
+happen to sit next to the scripts. The Streamlit apps are measured as the
+launcher starts them: their imports plus launcher.prewarm(), without
+executing the app script itself. Pass --model-dir to prewarm a real model.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, 'benchmark_results', 'startup_baseline.json')
+
+ENTRY_POINTS = {
+    'face_classification_model': 'import face_classification_model',
+    'serving': 'import face_classification_model, skin_measurements, joblib',
+    'model_management': 'import model_management',
+    'update_model': 'import update_model',
+    'quick_setup': 'import quick_setup',
+    'config_updater': 'import config_updater',
+    'streamlit_face_app': ('import streamlit, pandas, PIL.Image, face_classification_model, metrics, '
+                           'analysis_log, image_gate, launcher; launcher.prewarm()'),
+    'streamlit_app': ('import streamlit, pandas, PIL.Image, face_classification_model, image_gate, '
+                      'launcher; launcher.prewarm()'),
+}
+
+
+def parse_importtime(stderr):
+    """Return (total import µs, [(cumulative µs, module)] for top-level imports)"""
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            total += int(cumulative) if depth == 0 else 0
+            modules.append((int(cumulative), name.strip()))
+    return total, modules
+
+
+def scratch_dir(model_dir=None):
+    """Empty temporary working directory, seeded with the model artifacts of `model_dir`"""
+    from face_classification_model import MODEL_PATH, SCALER_PATH, PIPELINE_PATH
+
+    workdir = tempfile.mkdtemp(prefix='startup-')
+    if model_dir:
+        for name in (MODEL_PATH, SCALER_PATH, PIPELINE_PATH):
+            if os.path.exists(os.path.join(model_dir, name)):
+                shutil.copy2(os.path.join(model_dir, name), workdir)
+    return workdir
+
+
+def measure(code, runs, workdir):
+    """Fastest of `runs` fresh-interpreter imports of `code`, run inside `workdir`"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SCRIPTS_DIR, env.get('PYTHONPATH')]))
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=workdir, env=env, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+            return {'error': error}
+        total, modules = parse_importtime(result.stderr)
+        if best is None or total < best['import_ms'] * 1000:
+            modules.sort(reverse=True)
+            best = {
+                'import_ms': total / 1000,
+                'wall_ms': wall * 1000,
+                'heaviest': [[name, us / 1000] for us, name in modules[:5]],
+            }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('entries', nargs='*', default=list(ENTRY_POINTS),
+                        help='entry points to measure (default: all)')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown before flagging a regression')
+    parser.add_argument('--model-dir', default=None,
+                        help='copy the saved model from here so the app entries prewarm it')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    workdir = scratch_dir(args.model_dir)
+    results = {}
+    regressions = []
+    print(f"{'entry point':<28} {'import ms':>10} {'wall ms':>9} {'baseline':>9}")
+    try:
+        for name in args.entries:
+            result = measure(ENTRY_POINTS[name], args.runs, workdir)
+            results[name] = result
+            if 'error' in result:
+                print(f"{name:<28} {'error':>10}  {result['error']}")
+                continue
+
+            reference = baseline.get(name, {}).get('import_ms')
+            flag = ''
+            if reference and result['import_ms'] > reference * (1 + args.tolerance):
+                regressions.append(name)
+                flag = '  REGRESSION'
+            reference_text = f"{reference:.1f}" if reference else '-'
+            print(f"{name:<28} {result['import_ms']:>10.1f} {result['wall_ms']:>9.1f} {reference_text:>9}{flag}")
+            for module, ms in result['heaviest']:
+                print(f"    {module:<32} {ms:>8.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"Cold-start regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
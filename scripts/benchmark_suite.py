@@ -0,0 +1,190 @@
+"""
+Offline benchmark suite for the full classification pipeline.
+
+Runs against a synthetic dataset in a temporary working directory, so nothing
+touches the network (--http serves it through the local blob server). Covers CSV load/parse, feature matrix construction,
+training, model load, single and batch predict and the Streamlit prediction
+path, for each dataset size and batch size. Results are written as JSON and
+compared with a stored baseline; the script exits non-zero on regressions.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from image_gate import ImageGate
+from synthetic_data import generate_dataset, synthetic_image
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(SCRIPTS_DIR, 'benchmark_results')
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, 'pipeline_baseline.json')
+
+
+def upload_bytes(seed=0, size=(640, 480)):
+    """JPEG bytes shaped like a typical uploaded photo"""
+    rng = np.random.default_rng(seed)
+    image = Image.fromarray(synthetic_image(rng, seed % 3, size))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def timed(fn, repeats=1):
+    """Median wall time of `fn` in milliseconds, plus the last return value"""
+    timings, value = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000, value
+
+
+def streamlit_path(classifier, data):
+    """Mirror of the upload button handler in streamlit_face_app.py
+
+    The apps put an ImageGate in front of predict, so `classifier` should
+    carry one. A rejected upload raises, because its latency is not that of
+    an analysis.
+    """
+    image = Image.open(io.BytesIO(data))
+    img_bytes = io.BytesIO()
+    image.save(img_bytes, format='PNG')
+    img_bytes.seek(0)
+    result = classifier.predict(img_bytes)
+    if 'error' in result:
+        raise RuntimeError(f"Upload failed on the app path: {result['error']}")
+    return result
+
+
+def run_dataset(rows, batch_sizes, repeats, base_url=None):
+    """Benchmark every stage for one dataset size; returns {stage: ms}
+
+    With `base_url` (a local blob server) the CSV is fetched over HTTP, so the
+    network code path is measured too.
+    """
+    from face_classification_model import JiabaoFaceClassifier, read_csv_source
+
+    results = {}
+    csv_name = f'databaseJBC_{rows}.csv'
+    generate_dataset(csv_name, rows)
+    source = f'{base_url}/{csv_name}' if base_url else csv_name
+
+    results['csv_parse_ms'], _ = timed(lambda: read_csv_source(source))
+    results['feature_matrix_ms'], (X, y) = timed(
+        lambda: JiabaoFaceClassifier(feature_store_dir=None).load_data(source))
+
+    cached = JiabaoFaceClassifier()
+    cached.load_data(source)
+    results['feature_matrix_cached_ms'], _ = timed(lambda: cached.load_data(source))
+
+    results['train_ms'], _ = timed(lambda: JiabaoFaceClassifier().fit(X, y))
+    results['model_load_ms'], _ = timed(lambda: JiabaoFaceClassifier().load_model(), repeats)
+
+    classifier = JiabaoFaceClassifier()
+    classifier.load_model()
+    uploads = [upload_bytes(seed) for seed in range(max(batch_sizes))]
+    classifier.predict(io.BytesIO(uploads[0]))  # first-call warmup
+
+    results['predict_single_ms'], _ = timed(lambda: classifier.predict(io.BytesIO(uploads[0])), repeats)
+    for batch_size in batch_sizes:
+        batch_ms, _ = timed(lambda: classifier.predict_batch([io.BytesIO(data) for data in uploads[:batch_size]]),
+                            repeats)
+        results[f'predict_batch_{batch_size}_ms'] = batch_ms
+        results[f'predict_batch_{batch_size}_per_image_ms'] = batch_ms / batch_size
+    # Gated like the shared classifier in the apps
+    classifier.gate = ImageGate()
+    results['streamlit_predict_ms'], _ = timed(lambda: streamlit_path(classifier, uploads[0]), repeats)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return [(case, stage, baseline ms, current ms)] for stages slower than the tolerance"""
+    regressions = []
+    for case, stages in results.items():
+        for stage, value in stages.items():
+            reference = baseline.get(case, {}).get(stage)
+            if reference and value > reference * (1 + tolerance):
+                regressions.append((case, stage, reference, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[200, 1000],
+                        help='synthetic dataset sizes to benchmark')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=None, help='results JSON (default: timestamped file)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--http', action='store_true',
+                        help='fetch the CSV through a local blob server instead of the filesystem')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='fixed per-request latency of the local blob server')
+    args = parser.parse_args()
+
+    results = {}
+    start_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='jiabao_bench_') as workdir:
+        # Model artifacts and the feature store are written relative to the cwd
+        os.chdir(workdir)
+        server, base_url = None, None
+        if args.http:
+            from blob_server import start_background
+            server, base_url = start_background(workdir, args.latency_ms)
+        try:
+            for rows in args.rows:
+                print(f"Benchmarking {rows} rows...")
+                results[f'rows={rows}'] = run_dataset(rows, args.batch_sizes, args.repeats, base_url)
+        finally:
+            if server is not None:
+                server.shutdown()
+            os.chdir(start_dir)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'source': 'http' if args.http else 'file',
+        },
+        'results': results,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for case, stages in results.items():
+        print(f"\n{case}")
+        for stage, value in stages.items():
+            print(f"  {stage:<36} {value:>10.2f}")
+    print(f"\nResults written to {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for case, stage, reference, value in regressions:
+            print(f"REGRESSION {case} {stage}: {reference:.2f} -> {value:.2f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Local stand-in for the Vercel blob store.
+
+Serves a directory over HTTP with the behaviour the network code relies on:
+strong ETags with If-None-Match (304), single byte ranges (206/416) and
+Accept-Ranges, plus an optional fixed latency per request so network code
+paths can be benchmarked deterministically without touching the internet.
+"""
+import argparse
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+CHUNK_SIZE = 1 << 20
+
+
+class BlobRequestHandler(BaseHTTPRequestHandler):
+    # Set per server by make_server()
+    root = '.'
+    latency = 0.0
+    etags = {}
+    etag_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self):
+        path = unquote(urlparse(self.path).path).lstrip('/')
+        full = os.path.realpath(os.path.join(self.root, path))
+        if not full.startswith(os.path.realpath(self.root) + os.sep) or not os.path.isfile(full):
+            return None
+        return full
+
+    def _etag(self, path):
+        """Content hash like the blob store's, cached per (path, size, mtime)"""
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.etag_lock:
+            if key not in self.etags:
+                digest = hashlib.md5()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                self.etags[key] = f'"{digest.hexdigest()}"'
+            return self.etags[key]
+
+    def _parse_range(self, header, size):
+        """Return (start, end) inclusive for a single 'bytes=' range, or None if unsatisfiable"""
+        units, _, spec = header.partition('=')
+        if units.strip() != 'bytes' or ',' in spec:
+            return None
+        first, _, last = spec.strip().partition('-')
+        try:
+            if first == '':
+                length = int(last)
+                if length <= 0:
+                    return None
+                return max(size - length, 0), size - 1
+            start = int(first)
+            end = int(last) if last else size - 1
+        except ValueError:
+            return None
+        if start >= size or end < start:
+            return None
+        return start, min(end, size - 1)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        if self.latency:
+            time.sleep(self.latency)
+
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        etag = self._etag(path)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        # If-Range: only honour the range while the client's copy is current
+        if range_header and self.headers.get('If-Range', etag) == etag:
+            byte_range = self._parse_range(range_header, size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.end_headers()
+                return
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.end_headers()
+        if not send_body:
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Clients that stop reading early (header-only reads) hang up
+                    return
+                remaining -= len(chunk)
+
+
+def make_server(root, host='127.0.0.1', port=0, latency_ms=0):
+    """Create a blob server for `root`; port 0 picks a free port"""
+    handler = type('Handler', (BlobRequestHandler,), {
+        'root': os.path.abspath(root),
+        'latency': latency_ms / 1000.0,
+        'etags': {},
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_background(root, latency_ms=0):
+    """Serve `root` from a daemon thread; returns (server, base URL)"""
+    server = make_server(root, latency_ms=latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('directory', help='directory whose files are served as blobs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='fixed delay added to every request')
+    args = parser.parse_args()
+
+    server = make_server(args.directory, args.host, args.port, args.latency_ms)
+    print(f"Serving {os.path.abspath(args.directory)} at http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBlob server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compact colour-histogram and texture-statistics feature engine.
+
+Turns each 64x64 RGB image into a few hundred position-independent features
+instead of 12,288 raw pixels. Colour conversions and filters run once on the
+whole batch stacked into a tall image, and every histogram for every image is
+counted in a single np.bincount over (image, bin) offsets.
+"""
+import cv2
+import numpy as np
+
+HSV_BINS = (16, 8, 8)
+HS_JOINT_BINS = (8, 8)
+LAB_L_BINS = 16
+LAB_AB_BINS = (8, 8)
+LBP_BINS = 32
+ORIENTATION_BINS = 8
+GRID = 2
+
+LBP_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+
+
+def _histograms(values, bins, n):
+    """Per-image normalised histograms of integer bin indices shaped (n, h, w)"""
+    flat = values.reshape(n, -1)
+    offsets = (np.arange(n) * bins)[:, np.newaxis]
+    counts = np.bincount((flat + offsets).ravel(), minlength=n * bins).reshape(n, bins)
+    return counts / flat.shape[1]
+
+
+def _quantize(channel, bins, scale=256):
+    return (channel.astype(np.int32) * bins) // scale
+
+
+def _local_binary_patterns(gray):
+    """8-neighbour LBP codes for an (n, h, w) batch, computed on the interior"""
+    centre = gray[:, 1:-1, 1:-1]
+    h, w = centre.shape[1:]
+    codes = np.zeros(centre.shape, dtype=np.int32)
+    for bit, (dy, dx) in enumerate(LBP_OFFSETS):
+        neighbour = gray[:, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+        codes |= (neighbour >= centre).astype(np.int32) << bit
+    return codes
+
+
+def feature_count():
+    """Number of features produced per image"""
+    return (sum(HSV_BINS) + HS_JOINT_BINS[0] * HS_JOINT_BINS[1] + LAB_L_BINS
+            + LAB_AB_BINS[0] * LAB_AB_BINS[1] + LBP_BINS + ORIENTATION_BINS
+            + 2 * GRID * GRID + 4)
+
+
+def compute_color_texture_features(images):
+    """Feature matrix (n, feature_count()) for an (n, h, w, 3) uint8 RGB batch"""
+    images = np.ascontiguousarray(images, dtype=np.uint8)
+    if images.ndim == 3:
+        images = images[np.newaxis]
+    n, h, w, _ = images.shape
+    tall = images.reshape(n * h, w, 3)
+    parts = []
+
+    # HSV: per-channel and joint hue/saturation histograms (OpenCV hue is 0-179)
+    hsv = cv2.cvtColor(tall, cv2.COLOR_RGB2HSV).reshape(n, h, w, 3)
+    hue = _quantize(hsv[..., 0], HSV_BINS[0], 180)
+    sat = _quantize(hsv[..., 1], HSV_BINS[1])
+    val = _quantize(hsv[..., 2], HSV_BINS[2])
+    parts += [_histograms(hue, HSV_BINS[0], n), _histograms(sat, HSV_BINS[1], n),
+              _histograms(val, HSV_BINS[2], n)]
+    joint_h = _quantize(hsv[..., 0], HS_JOINT_BINS[0], 180)
+    joint_s = _quantize(hsv[..., 1], HS_JOINT_BINS[1])
+    parts.append(_histograms(joint_h * HS_JOINT_BINS[1] + joint_s, HS_JOINT_BINS[0] * HS_JOINT_BINS[1], n))
+
+    # LAB: lightness and joint a*/b* chroma histograms
+    lab = cv2.cvtColor(tall, cv2.COLOR_RGB2LAB).reshape(n, h, w, 3)
+    parts.append(_histograms(_quantize(lab[..., 0], LAB_L_BINS), LAB_L_BINS, n))
+    a = _quantize(lab[..., 1], LAB_AB_BINS[0])
+    b = _quantize(lab[..., 2], LAB_AB_BINS[1])
+    parts.append(_histograms(a * LAB_AB_BINS[1] + b, LAB_AB_BINS[0] * LAB_AB_BINS[1], n))
+
+    # Texture: local binary patterns and gradient orientation histograms
+    gray = cv2.cvtColor(tall, cv2.COLOR_RGB2GRAY)
+    parts.append(_histograms(_local_binary_patterns(gray.reshape(n, h, w)) * LBP_BINS // 256, LBP_BINS, n))
+
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3).reshape(n, h, w)[:, 1:-1, 1:-1]
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3).reshape(n, h, w)[:, 1:-1, 1:-1]
+    magnitude, angle = cv2.cartToPolar(gx.reshape(-1, w - 2), gy.reshape(-1, w - 2))
+    magnitude = magnitude.reshape(n, -1)
+    orientation = (angle.reshape(n, -1) * ORIENTATION_BINS / (2 * np.pi)).astype(np.int32) % ORIENTATION_BINS
+    offsets = (np.arange(n) * ORIENTATION_BINS)[:, np.newaxis]
+    weighted = np.bincount((orientation + offsets).ravel(), weights=magnitude.ravel(),
+                           minlength=n * ORIENTATION_BINS).reshape(n, ORIENTATION_BINS)
+    parts.append(weighted / np.maximum(weighted.sum(axis=1, keepdims=True), 1e-6))
+
+    # Coarse layout: lightness mean/std per grid cell
+    lightness = lab[..., 0].astype(np.float32) / 255.0
+    cells = lightness.reshape(n, GRID, h // GRID, GRID, w // GRID)
+    parts += [cells.mean(axis=(2, 4)).reshape(n, -1), cells.std(axis=(2, 4)).reshape(n, -1)]
+
+    # Global texture statistics
+    laplacian = cv2.Laplacian(gray, cv2.CV_32F, ksize=3).reshape(n, h, w)[:, 1:-1, 1:-1]
+    gray_f = gray.reshape(n, h, w).astype(np.float32) / 255.0
+    parts.append(np.column_stack([
+        magnitude.mean(axis=1) / 255.0,
+        magnitude.std(axis=1) / 255.0,
+        laplacian.reshape(n, -1).var(axis=1) / 255.0 ** 2,
+        gray_f.reshape(n, -1).std(axis=1),
+    ]))
+
+    return np.hstack(parts)
+
+
+def features_from_pixel_rows(rows, image_size=(64, 64), batch_size=512):
+    """Feature matrix for flattened RGB pixel rows (the training matrix)"""
+    width, height = image_size
+    rows = np.asarray(rows)
+    result = np.zeros((len(rows), feature_count()))
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size, :width * height * 3]
+        images = np.clip(batch, 0, 255).astype(np.uint8).reshape(-1, height, width, 3)
+        result[start:start + batch_size] = compute_color_texture_features(images)
+    return result
@@ -1,58 +1,338 @@
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
-from sklearn.preprocessing import StandardScaler
-import joblib
-import requests
-import json
-import cv2
 from PIL import Image
 import io
 import base64
+import os
+import threading
+import time
+
+from image_gate import ImageRejected
+from metrics import METRICS, MetricsRegistry
+from profiling import profiled
+
+# Only numpy and PIL are imported eagerly. joblib is imported when a model is
+# saved or loaded, and pandas, requests and the sklearn training classes only
+# inside the training methods, so serving and simple tools start fast.
+
+IMAGE_SIZE = (64, 64)
+
+# Bump whenever image_to_pixels or the CSV pixel parsing changes so that
+# cached rows in the feature store are not reused across extractor versions
+FEATURE_EXTRACTOR_VERSION = 'rgb64-v1'
+
+MODEL_PATH = 'face_classifier_model.pkl'
+SCALER_PATH = 'feature_scaler.pkl'
+PIPELINE_PATH = 'model_pipeline.pkl'
+
+FEATURE_ENGINES = ('pixels', 'histogram')
+
+# Estimators that can sit behind the shared scaler/reduction pipeline; all of
+# them expose predict_proba and classes_, so serving is backend-agnostic
+BACKENDS = ('random_forest', 'extra_trees', 'hist_gradient_boosting', 'logistic_regression')
+
+# Display names for the UIs
+BACKEND_LABELS = {
+    'random_forest': 'Random Forest',
+    'extra_trees': 'Extra Trees',
+    'hist_gradient_boosting': 'Histogram Gradient Boosting',
+    'logistic_regression': 'Logistic Regression',
+}
+
+MEASUREMENT_COLUMNS = ['kadar_minyak', 'kadar_air', 'ukuran_pori']
+
+TABULAR_COLUMNS = ['FotoCS', 'kadar minyak', 'kadar air', 'ukuran pori', 'Tekstur Kulit']
+
+# Stages reported to predict()'s progress callback, in order. 'forest' is the
+# model evaluation whichever backend is configured, so metric names stay stable
+PREDICT_STAGES = ('decode', 'features', 'scale', 'forest')
+
+
+def image_to_pixels(image):
+    """Convert a PIL image to the 64x64 RGB uint8 array used as pixel features"""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image.resize(IMAGE_SIZE), dtype=np.uint8)
+
+
+def make_estimator(backend):
+    """Unfitted classifier for one of BACKENDS"""
+    if backend == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42
+        )
+    if backend == 'extra_trees':
+        # Random split thresholds: no per-feature sort, so much cheaper to fit
+        # on thousands of pixel columns
+        from sklearn.ensemble import ExtraTreesClassifier
+        return ExtraTreesClassifier(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42
+        )
+    if backend == 'hist_gradient_boosting':
+        # Features are binned once into 255 buckets; one shallow tree per
+        # class and iteration
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(
+            max_iter=100,
+            learning_rate=0.1,
+            early_stopping=True,
+            random_state=42
+        )
+    if backend == 'logistic_regression':
+        # Linear baseline; prediction is a single matrix-vector product
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(C=0.1, max_iter=1000)
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def read_csv_source(csv_url, **kwargs):
+    """Read a CSV from a URL or a local path"""
+    import pandas as pd
+    
+    if os.path.exists(csv_url):
+        return pd.read_csv(csv_url, **kwargs)
+    import requests
+    
+    response = requests.get(csv_url)
+    response.raise_for_status()
+    return pd.read_csv(io.StringIO(response.text), **kwargs)
+
+
+def gather_plan(feature_columns):
+    """Map feature columns to pixels, colour features and measurements
+    
+    Built once per published model, so serving a pruned model gathers and
+    scales only the selected columns.
+    """
+    n_pixels = IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3
+    pixel_slots, pixel_indices, measurement_slots, measurement_indices = [], [], [], []
+    color_slots, color_indices = [], []
+    for slot, name in enumerate(feature_columns):
+        if name.startswith('color_'):
+            color_slots.append(slot)
+            color_indices.append(int(name[len('color_'):]))
+        elif name.startswith('pixel_'):
+            index = int(name[len('pixel_'):])
+            if index < n_pixels:
+                pixel_slots.append(slot)
+                pixel_indices.append(index)
+        elif name in MEASUREMENT_COLUMNS:
+            measurement_slots.append(slot)
+            measurement_indices.append(MEASUREMENT_COLUMNS.index(name))
+    
+    return {
+        'pixel_slots': np.array(pixel_slots, dtype=int),
+        'pixel_indices': np.array(pixel_indices, dtype=int),
+        'measurement_slots': np.array(measurement_slots, dtype=int),
+        'measurement_indices': np.array(measurement_indices, dtype=int),
+        'color_slots': np.array(color_slots, dtype=int),
+        'color_indices': np.array(color_indices, dtype=int),
+    }
+
+
+class ServingPipeline:
+    """The fitted pieces a prediction needs, published together
+    
+    fit() and load_model() build a new instance and swap it in with one
+    attribute assignment; predict() reads it once, so a prediction running
+    during a retrain uses the old or the new model throughout, never a mix.
+    """
+    def __init__(self, model, scaler, reducer, feature_columns, model_version=None, pca_chunk_size=256):
+        self.model = model
+        self.scaler = scaler
+        self.reducer = reducer
+        self.feature_columns = feature_columns
+        self.model_version = model_version
+        self.pca_chunk_size = pca_chunk_size
+        self.plan = gather_plan(feature_columns)
+    
+    def transform(self, X):
+        """Apply the fitted scaler and reduction stage, chunked to bound memory"""
+        if self.reducer is None:
+            return self.scaler.transform(X)
+        return np.vstack([
+            self.reducer.transform(self.scaler.transform(X[start:start + self.pca_chunk_size]))
+            for start in range(0, len(X), self.pca_chunk_size)
+        ])
+
 
 class JiabaoFaceClassifier:
-    def __init__(self):
+    def __init__(self, feature_store_dir='feature_store', measurement_source='image',
+                 n_components=None, pca_chunk_size=256, feature_engine='pixels', metrics=None,
+                 analysis_log=None, model_dir=None, backend='random_forest', gate=None):
         self.model = None
-        self.scaler = StandardScaler()
+        # Estimator behind the feature pipeline, one of BACKENDS
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        # Artifacts live in the working directory unless a model_dir is given
+        # (one directory per variant, see model_pool)
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir or '', MODEL_PATH)
+        self.scaler_path = os.path.join(model_dir or '', SCALER_PATH)
+        self.pipeline_path = os.path.join(model_dir or '', PIPELINE_PATH)
+        self.accuracy = None
+        # Stage latency histograms and counters; shared process-wide by default
+        self.metrics = metrics if metrics is not None else METRICS
+        # Optional AnalysisLog that records every prediction off the request path
+        self.analysis_log = analysis_log
+        # Optional ImageGate that rejects unusable uploads before inference
+        self.gate = gate
+        self.model_version = None
+        # 'pixels' uses the raw 64x64 RGB values; 'histogram' the compact
+        # colour/texture features from color_features
+        if feature_engine not in FEATURE_ENGINES:
+            raise ValueError(f"Unknown feature engine: {feature_engine}")
+        self.feature_engine = feature_engine
+        self.scaler = None
+        # Optional IncrementalPCA stage between the scaler and the forest
+        self.n_components = n_components
+        self.pca_chunk_size = pca_chunk_size
+        self.reducer = None
         self.feature_columns = None
+        # What predictions use; replaced as a whole by fit() and load_model()
+        self.serving = None
+        self.feature_store_dir = feature_store_dir
+        # 'image' trains on the same photo-derived measurements used at serving
+        # time; 'csv' uses the values recorded in the dataset
+        self.measurement_source = measurement_source
+    
+    def _feature_store(self, source):
+        """Open the feature store namespace for a pixel source ('zip' or 'csv')"""
+        if self.feature_store_dir is None:
+            return None
+        from feature_store import FeatureStore
+        return FeatureStore(self.feature_store_dir, f'{source}-{FEATURE_EXTRACTOR_VERSION}')
+    
+    @profiled('load_data')
+    def load_data(self, csv_url, zip_url=None):
+        """Load and preprocess the training data from CSV URL
+
+        When `zip_url` is given the pixel features are decoded from the photo
+        ZIP (joined on `FotoCS`) and only the tabular CSV columns are read.
+        """
+        import pandas as pd
         
-    def load_data(self, csv_url):
-        """Load and preprocess the training data from CSV URL"""
         print("Loading data from CSV...")
-        response = requests.get(csv_url)
+        if zip_url is not None:
+            return self.load_data_from_zip(csv_url, zip_url)
         
-        # Save CSV content to a temporary file-like object
-        csv_content = io.StringIO(response.text)
-        df = pd.read_csv(csv_content)
+        df = read_csv_source(csv_url)
         
         print(f"Data loaded: {len(df)} samples")
         print(f"Columns: {df.columns.tolist()}")
         
+        feature_matrix = self._parse_pixel_features(df['pixel_features'])
+        max_features = feature_matrix.shape[1]
+        
+        # Create feature DataFrame
+        feature_columns = [f'pixel_{i}' for i in range(max_features)]
+        features_df = pd.DataFrame(feature_matrix, columns=feature_columns)
+        
+        return self._add_tabular_features(features_df, df)
+    
+    def _parse_pixel_features(self, pixel_strings):
+        """Parse the `pixel_features` strings into a zero-padded matrix
+        
+        Parsed rows are cached in the feature store keyed by the hash of the
+        string, so only new or edited rows are parsed again.
+        """
+        pixel_strings = pixel_strings.tolist()
+        store = self._feature_store('csv')
+        if store is not None:
+            from feature_store import content_key
+            keys = [content_key(x) for x in pixel_strings]
+            todo_keys = set(store.missing(keys))
+        else:
+            keys = list(range(len(pixel_strings)))
+            todo_keys = set(keys)
+        
+        import json
+        
         # Parse pixel features from string to list
-        df['pixel_features_parsed'] = df['pixel_features'].apply(
-            lambda x: json.loads(x.replace('[', '[').replace(']', ']'))
-        )
+        parsed = {}
+        for key, x in zip(keys, pixel_strings):
+            if key in todo_keys and key not in parsed:
+                parsed[key] = json.loads(x)
+        
+        if store is not None:
+            print(f"Feature store: {len(keys) - len(todo_keys)} cached, {len(todo_keys)} parsed")
+            if parsed:
+                width = max(len(features) for features in parsed.values())
+                if len(store):
+                    if width > store.width:
+                        raise ValueError("pixel_features got longer; bump FEATURE_EXTRACTOR_VERSION")
+                    width = store.width
+                rows = np.zeros((len(parsed), width), dtype=np.float32)
+                for i, features in enumerate(parsed.values()):
+                    rows[i, :len(features)] = features
+                store.sync(list(parsed), rows, keys)
+            else:
+                store.sync([], [], keys)
+            return store.get_many(keys).astype(np.float64)
         
         # Convert pixel features to individual columns
-        max_features = max(len(features) for features in df['pixel_features_parsed'])
-        feature_matrix = np.zeros((len(df), max_features))
+        max_features = max(len(features) for features in parsed.values())
+        feature_matrix = np.zeros((len(pixel_strings), max_features))
         
-        for i, features in enumerate(df['pixel_features_parsed']):
+        for i, key in enumerate(keys):
+            features = parsed[key]
             feature_matrix[i, :len(features)] = features
-            
-        # Create feature DataFrame
-        feature_columns = [f'pixel_{i}' for i in range(max_features)]
-        features_df = pd.DataFrame(feature_matrix, columns=feature_columns)
         
-        # Add other numerical features
-        features_df['kadar_minyak'] = pd.to_numeric(df['kadar minyak'], errors='coerce')
-        features_df['kadar_air'] = pd.to_numeric(df['kadar air'], errors='coerce')
+        return feature_matrix
+    
+    def load_data_from_zip(self, csv_url, zip_url, workers=None):
+        """Build the training set from the photo ZIP joined to the CSV by FotoCS"""
+        import pandas as pd
+        from photo_ingestion import PhotoZipIngestor
         
-        # Encode pore size
-        pore_size_mapping = {'kecil': 0, 'sedang': 1, 'besar': 2}
-        features_df['ukuran_pori'] = df['ukuran pori'].map(pore_size_mapping)
+        df = read_csv_source(csv_url, usecols=lambda c: c in TABULAR_COLUMNS)
+        print(f"Data loaded: {len(df)} samples")
+        
+        ingestor = PhotoZipIngestor(zip_url, workers=workers)
+        positions, pixel_matrix = ingestor.build(df['FotoCS'].tolist(), store=self._feature_store('zip'))
+        df = df.iloc[positions].reset_index(drop=True)
+        print(f"Photos decoded: {len(df)} samples")
+        
+        feature_columns = [f'pixel_{i}' for i in range(pixel_matrix.shape[1])]
+        features_df = pd.DataFrame(pixel_matrix.astype(np.float64), columns=feature_columns)
+        
+        return self._add_tabular_features(features_df, df)
+    
+    def _add_tabular_features(self, features_df, df):
+        """Append the tabular measurements and map the target labels"""
+        import pandas as pd
+        
+        pixel_rows = features_df.to_numpy()
+        if self.feature_engine == 'histogram':
+            # Replace raw pixels with colour histograms and texture statistics
+            from color_features import features_from_pixel_rows
+            color = features_from_pixel_rows(pixel_rows, IMAGE_SIZE)
+            features_df = pd.DataFrame(color, columns=[f'color_{i}' for i in range(color.shape[1])])
+        
+        if self.measurement_source == 'image':
+            # Derive measurements from the pixels, exactly as at serving time
+            from skin_measurements import estimate_from_pixel_rows
+            measurements = estimate_from_pixel_rows(pixel_rows, IMAGE_SIZE)
+            features_df['kadar_minyak'] = measurements[:, 0]
+            features_df['kadar_air'] = measurements[:, 1]
+            features_df['ukuran_pori'] = measurements[:, 2]
+        else:
+            # Add other numerical features
+            features_df['kadar_minyak'] = pd.to_numeric(df['kadar minyak'], errors='coerce').values
+            features_df['kadar_air'] = pd.to_numeric(df['kadar air'], errors='coerce').values
+            
+            # Encode pore size
+            pore_size_mapping = {'kecil': 0, 'sedang': 1, 'besar': 2}
+            features_df['ukuran_pori'] = df['ukuran pori'].map(pore_size_mapping).values
         
         # Target variable
         target = df['Tekstur Kulit']
@@ -65,135 +345,491 @@ class JiabaoFaceClassifier:
         
         return features_df, target
     
-    def train_model(self, csv_url):
-        """Train the Random Forest model"""
+    @profiled('train_model')
+    def train_model(self, csv_url, zip_url=None, top_k=None, importance='impurity'):
+        """Train the model with the configured backend
+        
+        With `top_k`, the full model is trained first and then retrained on
+        its `top_k` most important features (see `prune`).
+        """
         # Load data
-        X, y = self.load_data(csv_url)
+        X, y = self.load_data(csv_url, zip_url)
+        
+        if top_k is None:
+            return self.fit(X, y)
+        
+        return self.fit_pruned(X, y, top_k, method=importance)
+    
+    def fit(self, X, y, save=True):
+        """Fit scaler, optional reduction stage and estimator on a loaded dataset"""
+        pipeline, accuracy = self._fit_pipeline(X, y)
+        self.accuracy = accuracy
+        self._publish(pipeline)
+        
+        if save:
+            self.save_model()
+        
+        return accuracy
+    
+    def fit_pruned(self, X, y, k, method='impurity', save=True):
+        """Fit the full model only to rank features, then publish the top-k retrain
+        
+        The full model is never published, so predictions running meanwhile
+        go from the previous model straight to the pruned one.
+        """
+        full, _ = self._fit_pipeline(X, y)
+        ranking = self.rank_features(X, y, method, pipeline=full)
+        return self.prune(X, y, k, ranking=ranking, save=save)
+    
+    def _fit_pipeline(self, X, y):
+        """Fit a new ServingPipeline without publishing it; returns (pipeline, accuracy)"""
+        from sklearn.metrics import accuracy_score, classification_report
+        from sklearn.preprocessing import StandardScaler
         
         # Handle missing values
         X = X.fillna(X.mean())
         
         # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        X_train, X_test, y_train, y_test = self._split(X, y)
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Everything is fitted into a new pipeline and published at the end,
+        # so predictions running meanwhile keep using the previous model
+        scaler = StandardScaler()
+        scaler.fit(X_train)
         
-        # Train Random Forest
-        print("Training Random Forest model...")
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42
-        )
+        # Reduce dimensionality
+        reducer = self._fit_reducer(X_train, scaler) if self.n_components else None
+        pipeline = ServingPipeline(None, scaler, reducer, X.columns.tolist(),
+                                   pca_chunk_size=self.pca_chunk_size)
+        X_train_scaled = pipeline.transform(X_train)
+        X_test_scaled = pipeline.transform(X_test)
+        
+        # Train the estimator
+        print(f"Training {self.backend} model...")
+        model = make_estimator(self.backend)
         
-        self.model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
         
         # Evaluate model
-        y_pred = self.model.predict(X_test_scaled)
+        y_pred = model.predict(X_test_scaled)
         accuracy = accuracy_score(y_test, y_pred)
+        pipeline.model = model
+        pipeline.model_version = time.strftime('%Y%m%d-%H%M%S')
         
         print(f"Model Accuracy: {accuracy:.3f}")
         print("\nClassification Report:")
         print(classification_report(y_test, y_pred))
         
+        return pipeline, float(accuracy)
+    
+    def _split(self, X, y):
+        from sklearn.model_selection import train_test_split
+        
+        return train_test_split(
+            X.to_numpy(), y, test_size=0.2, random_state=42, stratify=y
+        )
+    
+    def rank_features(self, X, y, method='impurity', pipeline=None):
+        """Rank feature columns of `X` by importance to the fitted model
+        
+        'impurity' uses the tree ensemble's feature_importances_; 'permutation'
+        measures the accuracy drop on the held-out split, which is more
+        reliable but costs one pass over the test set per feature and repeat.
+        Backends without impurity importances need 'permutation'. Ranks the
+        published model unless an unpublished `pipeline` is given.
+        """
+        pipeline = pipeline or self.serving
+        if pipeline.reducer is not None:
+            raise ValueError("Feature pruning needs a model trained without the PCA stage")
+        
+        if method == 'impurity':
+            if not hasattr(pipeline.model, 'feature_importances_'):
+                raise ValueError(f"The {self.backend} backend has no impurity importances; use 'permutation'")
+            importances = pipeline.model.feature_importances_
+        elif method == 'permutation':
+            from sklearn.inspection import permutation_importance
+            _, X_test, _, y_test = self._split(X.fillna(X.mean()), y)
+            importances = permutation_importance(
+                pipeline.model, pipeline.transform(X_test), y_test,
+                n_repeats=5, random_state=42, n_jobs=-1
+            ).importances_mean
+        else:
+            raise ValueError(f"Unknown importance method: {method}")
+        
+        return np.argsort(importances)[::-1]
+    
+    def prune(self, X, y, k, method='impurity', ranking=None, save=True):
+        """Retrain on the top-k most important columns of `X`
+        
+        The selected columns become the model's feature columns, so serving
+        only gathers and scales those pixels.
+        """
+        if ranking is None:
+            ranking = self.rank_features(X, y, method)
+        selected = np.sort(ranking[:k])
+        print(f"Pruning to {len(selected)} of {X.shape[1]} features...")
+        return self.fit(X.iloc[:, selected], y, save=save)
+    
+    def _fit_reducer(self, X_train, scaler):
+        """Fit IncrementalPCA chunk by chunk on scaled training data
+        
+        Only one scaled chunk is held in memory at a time, so the reduction
+        stage also works when the scaled matrix would not fit in RAM.
+        """
+        from sklearn.decomposition import IncrementalPCA
+        
+        n_components = min(self.n_components, X_train.shape[0], X_train.shape[1])
+        # Every partial_fit batch needs at least n_components rows
+        chunk_size = max(self.pca_chunk_size, n_components)
+        bounds = list(range(0, len(X_train), chunk_size))
+        if len(bounds) > 1 and len(X_train) - bounds[-1] < n_components:
+            bounds.pop()
+        bounds.append(len(X_train))
+        
+        print(f"Fitting IncrementalPCA with {n_components} components...")
+        reducer = IncrementalPCA(n_components=n_components)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            reducer.partial_fit(scaler.transform(X_train[start:end]))
+        print(f"Explained variance: {reducer.explained_variance_ratio_.sum():.3f}")
+        return reducer
+    
+    def transform(self, X):
+        """Apply the published scaler and reduction stage, chunked to bound memory"""
+        return self.serving.transform(X)
+    
+    def _publish(self, pipeline):
+        """Make `pipeline` the one predictions use"""
+        self.model, self.scaler, self.reducer = pipeline.model, pipeline.scaler, pipeline.reducer
+        self.feature_columns = pipeline.feature_columns
+        self.model_version = pipeline.model_version
+        # A single assignment: predictions see the old or the new pipeline
+        self.serving = pipeline
+    
+    def save_model(self):
+        """Persist the model, scaler and pipeline settings"""
+        import joblib
+        
+        if self.model_dir:
+            os.makedirs(self.model_dir, exist_ok=True)
+        
         # Save model and scaler
-        joblib.dump(self.model, 'face_classifier_model.pkl')
-        joblib.dump(self.scaler, 'feature_scaler.pkl')
+        joblib.dump(self.model, self.model_path)
+        joblib.dump(self.scaler, self.scaler_path)
+        joblib.dump({
+            'feature_columns': self.feature_columns,
+            'reducer': self.reducer,
+            'measurement_source': self.measurement_source,
+            'feature_engine': self.feature_engine,
+            'backend': self.backend,
+            'accuracy': self.accuracy,
+            'model_version': self.model_version,
+            'extractor_version': FEATURE_EXTRACTOR_VERSION,
+        }, self.pipeline_path)
+    
+    def load_model(self):
+        """Load a saved model; pipelines saved before the reduction stage still load"""
+        import joblib
         
-        return accuracy
+        model = joblib.load(self.model_path)
+        scaler = joblib.load(self.scaler_path)
+        reducer, feature_columns, model_version = None, self.feature_columns, None
+        if os.path.exists(self.pipeline_path):
+            pipeline = joblib.load(self.pipeline_path)
+            feature_columns = pipeline['feature_columns']
+            reducer = pipeline['reducer']
+            model_version = pipeline.get('model_version')
+            self.n_components = reducer.n_components_ if reducer is not None else None
+            self.measurement_source = pipeline.get('measurement_source', self.measurement_source)
+            self.feature_engine = pipeline.get('feature_engine', 'pixels')
+            self.backend = pipeline.get('backend', 'random_forest')
+            self.accuracy = pipeline.get('accuracy')
+        elif feature_columns is None:
+            # Older artifacts: all pixels followed by the three measurements
+            n_pixels = scaler.n_features_in_ - len(MEASUREMENT_COLUMNS)
+            feature_columns = [f'pixel_{i}' for i in range(n_pixels)] + MEASUREMENT_COLUMNS
+        self._publish(ServingPipeline(model, scaler, reducer, feature_columns, model_version,
+                                      self.pca_chunk_size))
+    
+    def _decode_image(self, image_data):
+        """Open an upload (file-like, path or base64 data URL) as a PIL image"""
+        # Convert base64 to image if needed
+        if isinstance(image_data, str) and image_data.startswith('data:image'):
+            # Remove data URL prefix
+            image_data = image_data.split(',')[1]
+            image_bytes = base64.b64decode(image_data)
+            image = Image.open(io.BytesIO(image_bytes))
+        else:
+            image = Image.open(image_data)
+        # Image.open only reads the header, so tiny images are rejected undecoded
+        if self.gate is not None:
+            self.gate.check_header(image)
+        # PIL decodes lazily; force it here so decode time is measured as such
+        image.load()
+        return image
+    
+    def _assemble_features(self, img_array, pipeline):
+        """Build `pipeline`'s feature row from a resized 64x64 RGB array"""
+        # Create feature vector matching training data format
+        features = np.zeros(len(pipeline.feature_columns))
+        plan = pipeline.plan
+        
+        # Gather only the pixels the model uses (all of them unless pruned);
+        # columns beyond the image size stay zero-padded
+        features[plan['pixel_slots']] = img_array.ravel()[plan['pixel_indices']]
+        
+        # Colour/texture engine features, when the model was trained on them
+        if len(plan['color_slots']):
+            from color_features import compute_color_texture_features
+            color = compute_color_texture_features(img_array)[0]
+            features[plan['color_slots']] = color[plan['color_indices']]
+        
+        # Estimate oil, moisture and pore size from the same resized image
+        if len(plan['measurement_slots']):
+            from skin_measurements import estimate_skin_measurements
+            measurements = estimate_skin_measurements(img_array)[0]
+            features[plan['measurement_slots']] = measurements[plan['measurement_indices']]
+        
+        return features.reshape(1, -1)
     
-    def extract_features_from_image(self, image_data):
-        """Extract features from uploaded image"""
+    @profiled('extract_features')
+    def extract_features_from_image(self, image_data, progress=None, pipeline=None):
+        """Extract features from uploaded image for `pipeline` (default: the published one)"""
+        pipeline = pipeline or self.serving
         try:
-            # Convert base64 to image if needed
-            if isinstance(image_data, str) and image_data.startswith('data:image'):
-                # Remove data URL prefix
-                image_data = image_data.split(',')[1]
-                image_bytes = base64.b64decode(image_data)
-                image = Image.open(io.BytesIO(image_bytes))
-            else:
-                image = Image.open(image_data)
-            
-            # Convert to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize to standard size
-            image = image.resize((64, 64))
-            
-            # Convert to numpy array
-            img_array = np.array(image)
+            with self.metrics.timer('decode'):
+                image = self._decode_image(image_data)
             
-            # Flatten RGB values
-            pixel_features = img_array.flatten()
+            # Convert to RGB and resize to standard size
+            with self.metrics.timer('resize'):
+                img_array = image_to_pixels(image)
+            self._report(progress, 'decode')
             
-            # Simulate additional features (in real implementation, these would be calculated)
-            # For demo purposes, we'll use random values within realistic ranges
-            np.random.seed(42)  # For reproducible results
-            kadar_minyak = np.random.uniform(0.2, 0.8)
-            kadar_air = np.random.uniform(0.3, 0.7)
-            ukuran_pori = np.random.randint(0, 3)  # 0=kecil, 1=sedang, 2=besar
+            if self.gate is not None:
+                with self.metrics.timer('gate'):
+                    self.gate.check_content(image, img_array)
             
-            # Create feature vector matching training data format
-            features = np.zeros(len(self.feature_columns))
-            
-            # Fill pixel features (pad or truncate as needed)
-            pixel_end = min(len(pixel_features), len(self.feature_columns) - 3)
-            features[:pixel_end] = pixel_features[:pixel_end]
-            
-            # Add other features
-            features[-3] = kadar_minyak
-            features[-2] = kadar_air  
-            features[-1] = ukuran_pori
-            
-            return features.reshape(1, -1)
+            with self.metrics.timer('features'):
+                features = self._assemble_features(img_array, pipeline)
+            self._report(progress, 'features')
+            return features
             
+        except ImageRejected:
+            raise
         except Exception as e:
             print(f"Error extracting features: {e}")
             return None
     
-    def predict(self, image_data):
-        """Predict skin type from image"""
-        if self.model is None:
+    def _ensure_model(self):
+        """The published pipeline, loading the saved model on first use; None if there is none"""
+        if self.serving is None:
             # Try to load saved model
             try:
-                self.model = joblib.load('face_classifier_model.pkl')
-                self.scaler = joblib.load('feature_scaler.pkl')
+                self.load_model()
             except:
-                return {"error": "Model not trained yet"}
-        
-        # Extract features
-        features = self.extract_features_from_image(image_data)
-        if features is None:
-            return {"error": "Could not extract features from image"}
-        
-        # Scale features
-        features_scaled = self.scaler.transform(features)
-        
-        # Make prediction
-        prediction = self.model.predict(features_scaled)[0]
-        probabilities = self.model.predict_proba(features_scaled)[0]
-        
-        # Get class names
-        classes = self.model.classes_
+                return None
+        return self.serving
+    
+    def _result(self, probabilities, classes):
+        """Build the prediction result from one row of class probabilities"""
         
-        # Create result
-        result = {
-            "prediction": prediction,
+        # Every backend's predict() is the argmax of predict_proba(), so the
+        # model is evaluated only once
+        return {
+            "prediction": classes[int(np.argmax(probabilities))],
             "confidence": float(max(probabilities)),
             "probabilities": {
                 classes[i]: float(probabilities[i]) 
                 for i in range(len(classes))
             }
         }
+    
+    def _reject(self, rejection, elapsed_ms):
+        """Count an image gate rejection and the compute it saved"""
+        self.metrics.increment('gate_rejected')
+        self.metrics.increment(f'gate_{rejection.reason}')
+        # Saved compute: the mean full prediction minus what the rejection cost
+        self.metrics.increment('gate_saved_ms', max(self.metrics.mean('total') - elapsed_ms, 0.0))
+        return {"error": str(rejection), "rejected": rejection.reason}
+    
+    def _log(self, result, latency_ms, model_version):
+        """Queue a prediction in the analysis log, if one is attached"""
+        if self.analysis_log is not None:
+            self.analysis_log.record(str(result['prediction']), result['confidence'],
+                                     latency_ms, model_version)
+    
+    def _report(self, progress, stage):
+        """Tell a progress callback that `stage` finished"""
+        if progress is not None:
+            progress(stage, (PREDICT_STAGES.index(stage) + 1) / len(PREDICT_STAGES))
+    
+    @profiled('predict')
+    def predict(self, image_data, progress=None):
+        """Predict skin type from image
+        
+        `progress(stage, fraction)` is called as each of PREDICT_STAGES
+        completes, so a UI can show real progress instead of a timer.
+        """
+        start = time.perf_counter()
+        # Read once: a retrain publishing meanwhile does not affect this call
+        pipeline = self._ensure_model()
+        if pipeline is None:
+            return {"error": "Model not trained yet"}
+        
+        # Extract features; the image gate may reject the upload on the way
+        try:
+            features = self.extract_features_from_image(image_data, progress, pipeline)
+        except ImageRejected as e:
+            return self._reject(e, (time.perf_counter() - start) * 1000)
+        if features is None:
+            self.metrics.increment('errors')
+            return {"error": "Could not extract features from image"}
+        
+        # Scale features (and reduce, when the model has a reduction stage)
+        with self.metrics.timer('scale'):
+            features_scaled = pipeline.transform(features)
+        self._report(progress, 'scale')
+        
+        # Make prediction
+        with self.metrics.timer('forest'):
+            probabilities = pipeline.model.predict_proba(features_scaled)[0]
+        self._report(progress, 'forest')
+        
+        result = self._result(probabilities, pipeline.model.classes_)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.metrics.observe('total', latency_ms)
+        self.metrics.increment('predictions')
+        self._log(result, latency_ms, pipeline.model_version)
+        self.metrics.maybe_export()
         
         return result
+    
+    def warmup(self):
+        """Load the saved model and run one throwaway prediction
+        
+        The warmup goes to a private metrics registry, is not logged and
+        bypasses the image gate (its image is blank), so it does not show up
+        in the dashboard. Returns False without a model.
+        """
+        if self._ensure_model() is None:
+            return False
+        buffer = io.BytesIO()
+        Image.new('RGB', IMAGE_SIZE, (200, 160, 140)).save(buffer, format='PNG')
+        buffer.seek(0)
+        
+        metrics, analysis_log, gate = self.metrics, self.analysis_log, self.gate
+        self.metrics, self.analysis_log, self.gate = MetricsRegistry(path=None), None, None
+        try:
+            self.predict(buffer)
+        finally:
+            self.metrics, self.analysis_log, self.gate = metrics, analysis_log, gate
+        return True
+    
+    def predict_batch(self, images):
+        """Predict skin types for several images with one scaler and forest pass
+        
+        Returns one result per image, in order; images whose features cannot
+        be extracted or that the image gate rejects get an error result instead.
+        Every result carries `latency_ms`: the image's own decode and feature
+        time plus its share of the batched scale and forest passes.
+        """
+        # Read once, so the whole batch uses one model
+        pipeline = self._ensure_model()
+        if pipeline is None:
+            return [{"error": "Model not trained yet"} for _ in images]
+        
+        start = time.perf_counter()
+        rows, results, latencies = [], [], []
+        for image_data in images:
+            image_start = time.perf_counter()
+            try:
+                rows.append(self.extract_features_from_image(image_data, pipeline=pipeline))
+                results.append({"error": "Could not extract features from image"})
+            except ImageRejected as e:
+                rows.append(None)
+                results.append(self._reject(e, (time.perf_counter() - image_start) * 1000))
+            latencies.append((time.perf_counter() - image_start) * 1000)
+        valid = [i for i, row in enumerate(rows) if row is not None]
+        self.metrics.increment('errors', sum(1 for result in results if 'rejected' not in result) - len(valid))
+        
+        if valid:
+            # Batch stages are recorded separately so they do not skew the
+            # per-image latency histograms
+            shared_start = time.perf_counter()
+            with self.metrics.timer('batch_scale'):
+                features_scaled = pipeline.transform(np.vstack([rows[i] for i in valid]))
+            with self.metrics.timer('batch_forest'):
+                probabilities = pipeline.model.predict_proba(features_scaled)
+            shared_ms = (time.perf_counter() - shared_start) * 1000 / len(valid)
+            for i, row_probabilities in zip(valid, probabilities):
+                results[i] = self._result(row_probabilities, pipeline.model.classes_)
+                latencies[i] += shared_ms
+        
+        for result, latency_ms in zip(results, latencies):
+            result['latency_ms'] = latency_ms
+        if not valid:
+            return results
+        
+        self.metrics.observe('batch_total', (time.perf_counter() - start) * 1000)
+        self.metrics.increment('predictions', len(valid))
+        for i in valid:
+            self._log(results[i], latencies[i], pipeline.model_version)
+        self.metrics.maybe_export()
+        
+        return results
+    
+    def predict_stream(self, images, batch_size=16, workers=None):
+        """Yield (index, result) for every image as its batch finishes
+        
+        Images are split into batches that run through predict_batch on a
+        thread pool; PIL decoding and numpy release the GIL, so batches
+        overlap. Results arrive in completion order, not input order. A batch
+        that raises yields an error result for each of its images instead of
+        ending the stream.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        if self._ensure_model() is None:
+            for i in range(len(images)):
+                yield i, {"error": "Model not trained yet"}
+            return
+        
+        starts = range(0, len(images), batch_size)
+        workers = workers or min(4, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.predict_batch, images[start:start + batch_size]): start
+                for start in starts
+            }
+            for future in as_completed(futures):
+                start = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"Batch prediction failed: {e}")
+                    count = len(images[start:start + batch_size])
+                    self.metrics.increment('errors', count)
+                    results = [{"error": f"Batch prediction failed: {e}"} for _ in range(count)]
+                for offset, result in enumerate(results):
+                    yield start + offset, result
+
+
+_shared_classifier = None
+_shared_lock = threading.Lock()
+
+
+def shared_classifier():
+    """Process-wide classifier with the saved model loaded and warmed up
+    
+    launcher.py calls this before the Streamlit server starts, so sessions in
+    the same process get a ready model on their first request.
+    """
+    global _shared_classifier
+    with _shared_lock:
+        if _shared_classifier is None:
+            classifier = JiabaoFaceClassifier()
+            classifier.warmup()
+            _shared_classifier = classifier
+        return _shared_classifier
 
 # Initialize and train the model
 if __name__ == "__main__":
@@ -206,5 +842,6 @@ if __name__ == "__main__":
         print(f"\nModel training completed with accuracy: {accuracy:.3f}")
         print("Model saved as 'face_classifier_model.pkl'")
         print("Scaler saved as 'feature_scaler.pkl'")
+        print("Pipeline saved as 'model_pipeline.pkl'")
     except Exception as e:
         print(f"Error during training: {e}")
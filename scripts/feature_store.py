@@ -0,0 +1,197 @@
+"""
+Persistent per-image feature store for incremental dataset rebuilds.
+
+Rows are keyed by image content hash and namespaced by extractor version, so a
+rebuild only computes features for new or changed photos and a version bump
+starts from a clean namespace. Entries whose images disappeared are evicted.
+
+Rows live in append-only .npy segments: a rebuild writes its new rows as one
+segment and rewrites only the small key -> (segment, row) index, so adding 50
+photos costs 50 rows of I/O however large the archive is. Evicted rows stay
+in their segment as dead space until it passes COMPACT_DEAD_SHARE (or the
+segment count passes MAX_SEGMENTS), then all live rows are compacted once.
+"""
+import os
+import json
+import hashlib
+
+import numpy as np
+
+
+def content_key(data):
+    """Content hash for raw bytes or strings"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def zip_member_key(info):
+    """Content hash for a ZIP member taken from its central directory entry
+
+    CRC32 plus uncompressed size identifies the content without inflating it.
+    """
+    return f"{info.CRC:08x}-{info.file_size:x}"
+
+
+# Compact when this share of stored rows is dead, or when there are this many segments
+COMPACT_DEAD_SHARE = 0.5
+MAX_SEGMENTS = 32
+
+
+class FeatureStore:
+    def __init__(self, root='feature_store', version='v1'):
+        self.directory = os.path.join(root, version)
+        self.index_path = os.path.join(self.directory, 'index.json')
+        # key -> (segment name, row); segments are memory-mapped on load
+        self.entries = {}
+        self.segments = {}
+        self.stored_rows = 0
+        self.next_segment = 0
+        self._load()
+
+    def _load(self):
+        self.entries, self.segments, self.stored_rows = {}, {}, 0
+        if not os.path.exists(self.index_path):
+            self._load_legacy()
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            segments = {name: np.load(os.path.join(self.directory, name), mmap_mode='r')
+                        for name in index['segments']}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Feature store unreadable, rebuilding: {e}")
+            return
+        entries = {key: (segment, row) for key, (segment, row) in index['entries'].items()}
+        if any(segment not in segments or row >= len(segments[segment])
+               for segment, row in entries.values()):
+            print("Feature store index out of sync, rebuilding")
+            return
+        self.entries = entries
+        self.segments = segments
+        self.stored_rows = sum(len(features) for features in segments.values())
+        self.next_segment = index.get('next_segment', len(segments))
+
+    def _load_legacy(self):
+        """Adopt a store written as one keys.json + features.npy pair"""
+        keys_path = os.path.join(self.directory, 'keys.json')
+        matrix_path = os.path.join(self.directory, 'features.npy')
+        if not (os.path.exists(keys_path) and os.path.exists(matrix_path)):
+            return
+        try:
+            with open(keys_path, 'r', encoding='utf-8') as f:
+                keys = json.load(f)
+            features = np.load(matrix_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print(f"Feature store unreadable, rebuilding: {e}")
+            return
+        if len(keys) != len(features):
+            print("Feature store index out of sync, rebuilding")
+            return
+        self.entries = {key: ('features.npy', i) for i, key in enumerate(keys)}
+        self.segments = {'features.npy': features}
+        self.stored_rows = len(features)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    @property
+    def width(self):
+        """Feature columns per row (0 while the store is empty)"""
+        for features in self.segments.values():
+            return features.shape[1]
+        return 0
+
+    def missing(self, keys):
+        """Return the keys that still need their features computed"""
+        return [key for key in dict.fromkeys(keys) if key not in self.entries]
+
+    def get_many(self, keys):
+        """Gather stored feature rows for `keys` into a matrix"""
+        if not keys:
+            return np.zeros((0, 0), dtype=np.uint8)
+        first = next(iter(self.segments.values()))
+        out = np.empty((len(keys), first.shape[1]), dtype=first.dtype)
+        # One fancy-indexing pass per segment instead of one read per row
+        by_segment = {}
+        for i, key in enumerate(keys):
+            segment, row = self.entries[key]
+            slots, rows = by_segment.setdefault(segment, ([], []))
+            slots.append(i)
+            rows.append(row)
+        for segment, (slots, rows) in by_segment.items():
+            out[slots] = self.segments[segment][rows]
+        return out
+
+    def sync(self, new_keys, new_rows, live_keys):
+        """Append newly computed rows and evict every entry not in `live_keys`
+
+        New rows go to a fresh segment; evictions only touch the index. The
+        segment is written before the index and both are replaced
+        atomically, so an interrupted run leaves at most an unreferenced
+        segment, which the next compaction removes.
+        """
+        live = set(live_keys)
+        evicted = [key for key in self.entries if key not in live]
+        new = [(key, i) for i, key in enumerate(new_keys) if key in live and key not in self.entries]
+
+        if not new and not evicted:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        for key in evicted:
+            del self.entries[key]
+        if new:
+            name = f'segment-{self.next_segment:06d}.npy'
+            self.next_segment += 1
+            rows = np.asarray(new_rows)[[i for _, i in new]]
+            self._save_array(name, rows)
+            self.segments[name] = rows
+            self.stored_rows += len(rows)
+            for row, (key, _) in enumerate(new):
+                self.entries[key] = (name, row)
+
+        dead = self.stored_rows - len(self.entries)
+        if dead > COMPACT_DEAD_SHARE * self.stored_rows or len(self.segments) > MAX_SEGMENTS:
+            self._compact()
+        else:
+            self._write_index()
+
+        print(f"Feature store: +{len(new)} new, -{len(evicted)} evicted, {len(self.entries)} total")
+        self._load()
+
+    def _save_array(self, name, array):
+        tmp_path = os.path.join(self.directory, name + '.tmp.npy')
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def _write_index(self):
+        tmp_index = self.index_path + '.tmp'
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump({
+                # Fully evicted segments stay listed so their rows count as dead
+                'segments': sorted(self.segments),
+                'next_segment': self.next_segment,
+                'entries': self.entries,
+            }, f)
+        os.replace(tmp_index, self.index_path)
+
+    def _compact(self):
+        """Rewrite all live rows into one segment and delete the rest"""
+        keys = list(self.entries)
+        name = f'segment-{self.next_segment:06d}.npy'
+        self.next_segment += 1
+        if keys:
+            self._save_array(name, self.get_many(keys))
+        # Drop the old memory maps; the files go once the new index is in place
+        self.segments = {name: None} if keys else {}
+        self.entries = {key: (name, row) for row, key in enumerate(keys)}
+        self._write_index()
+        print(f"Feature store compacted: {self.stored_rows - len(keys)} dead rows dropped")
+
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.npy') and filename not in self.segments or filename == 'keys.json':
+                os.remove(os.path.join(self.directory, filename))
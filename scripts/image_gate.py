@@ -0,0 +1,131 @@
+"""
+Cheap checks that reject unusable uploads before the model runs.
+
+The image size is checked from the header, before the image is decoded.
+Exposure and detail are measured on the 64x64 array the classifier computes
+anyway, so they cost well under a millisecond. An optional face check runs
+OpenCV's bundled Haar cascade on a small grayscale thumbnail. A rejected
+image raises ImageRejected with a machine-readable reason; the classifier
+turns that into an error result and counts it in the metrics instead of
+returning a confident-looking label for a blank or black photo.
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+
+REASONS = {
+    'too_small': "Image is too small to analyse",
+    'too_dark': "Image is too dark to analyse",
+    'overexposed': "Image is overexposed",
+    'low_detail': "Image has no visible detail (blank or uniform)",
+    'no_face': "No face found in the image",
+}
+
+# ITU-R BT.601 luma weights, as used by PIL's 'L' conversion
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+
+
+class ImageRejected(ValueError):
+    def __init__(self, reason):
+        super().__init__(REASONS[reason])
+        self.reason = reason
+
+
+class ImageGate:
+    def __init__(self, min_side=64, dark_mean=40.0, bright_mean=235.0, clipped_share=0.6,
+                 min_std=4.0, face_check=False, face_thumbnail=320):
+        # Thresholds are on 0-255 luminance of the 64x64 model input
+        self.min_side = min_side
+        self.dark_mean = dark_mean
+        self.bright_mean = bright_mean
+        self.clipped_share = clipped_share
+        self.min_std = min_std
+        # Off by default: close-up skin photos often show no full face
+        self.face_check = face_check
+        self.face_thumbnail = face_thumbnail
+        self._cascade = None
+        self._cascade_lock = threading.Lock()
+
+    def check_header(self, image):
+        """Reject on the dimensions of a lazily opened PIL image (no decode)"""
+        if min(image.size) < self.min_side:
+            raise ImageRejected('too_small')
+
+    def check_content(self, image, img_array):
+        """Reject on exposure and detail of the 64x64 RGB array, then faces"""
+        luma = img_array.reshape(-1, 3).astype(np.float32) @ LUMA_WEIGHTS
+        mean = float(luma.mean())
+        if mean < self.dark_mean:
+            raise ImageRejected('too_dark')
+        if mean > self.bright_mean or float((luma >= 250).mean()) > self.clipped_share:
+            raise ImageRejected('overexposed')
+        if float(luma.std()) < self.min_std:
+            raise ImageRejected('low_detail')
+        if self.face_check and not self.has_face(image):
+            raise ImageRejected('no_face')
+
+    def check(self, image):
+        """Run every check on a PIL image; returns the rejection reason or None"""
+        from face_classification_model import image_to_pixels
+
+        try:
+            self.check_header(image)
+            self.check_content(image, image_to_pixels(image))
+        except ImageRejected as e:
+            return e.reason
+        return None
+
+    def _face_cascade(self):
+        """The bundled frontal-face cascade, loaded once; None without OpenCV"""
+        with self._cascade_lock:
+            if self._cascade is None:
+                # False marks a failed load, so it is only attempted once
+                self._cascade = False
+                try:
+                    import cv2
+                    cascade = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, FACE_CASCADE))
+                    if not cascade.empty():
+                        self._cascade = cascade
+                except (ImportError, AttributeError):
+                    pass
+                if self._cascade is False:
+                    # Builds without objdetect or without the bundled data files
+                    print("OpenCV face cascade not available; face check disabled")
+                    self.face_check = False
+            return self._cascade or None
+
+    def has_face(self, image):
+        """Whether the Haar cascade finds a face on a grayscale thumbnail"""
+        cascade = self._face_cascade()
+        if cascade is None:
+            return True
+        thumbnail = image.convert('L')
+        thumbnail.thumbnail((self.face_thumbnail, self.face_thumbnail))
+        gray = np.asarray(thumbnail)
+        min_size = max(24, min(gray.shape) // 5)
+        faces = cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=4,
+                                         minSize=(min_size, min_size))
+        return len(faces) > 0
+
+
+def main():
+    from PIL import Image
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('images', nargs='+', help='image files to check')
+    parser.add_argument('--face-check', action='store_true', help='also require a detectable face')
+    args = parser.parse_args()
+
+    gate = ImageGate(face_check=args.face_check)
+    for path in args.images:
+        with Image.open(path) as image:
+            reason = gate.check(image)
+        print(f"{path}: {'ok' if reason is None else f'rejected ({reason})'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Minimal HTTP inference endpoint for the skin-type classifier.
+
+POST /predict with the raw image bytes as the body returns the prediction
+as JSON (422 when no features can be extracted or the image gate rejects
+the upload, 503 without a model);
+GET /health answers once the model is loaded and warmed up. Used by
+load_test.py to measure the prediction path behind a real socket.
+
+With --pool-root, POST /predict?variant=<id> routes the request to that
+model variant through a ModelPool (404 for an unknown variant).
+"""
+import argparse
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    # Set per server by make_server()
+    classifier = None
+    pool = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_error(404)
+            return
+        if self.classifier.model is None:
+            self._send_json(503, {'status': 'no model'})
+        else:
+            self._send_json(200, {'status': 'ok', 'model_version': self.classifier.model_version})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/predict':
+            self.send_error(404)
+            return
+        variant = parse_qs(url.query).get('variant', [None])[0]
+        if variant is not None and self.pool is None:
+            self._send_json(404, {'error': 'This server has no model variants'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        if not 0 < length <= MAX_BODY_BYTES:
+            self._send_json(413 if length else 400, {'error': 'Body must be an image up to 20 MB'})
+            return
+
+        image_data = io.BytesIO(self.rfile.read(length))
+        if variant is None:
+            result = self.classifier.predict(image_data)
+            has_model = self.classifier.model is not None
+        else:
+            try:
+                result = self.pool.predict(variant, image_data)
+            except KeyError as e:
+                self._send_json(404, {'error': str(e.args[0])})
+                return
+            except RuntimeError as e:
+                self._send_json(503, {'error': str(e)})
+                return
+            # The pool only hands out variants whose model loaded
+            has_model = True
+
+        if 'error' not in result:
+            self._send_json(200, result)
+        elif not has_model:
+            self._send_json(503, result)
+        else:
+            self._send_json(422, result)
+
+
+def make_server(classifier, host='127.0.0.1', port=0, pool=None):
+    """Create an inference server for `classifier` (and an optional ModelPool); port 0 picks a free port"""
+    handler = type('Handler', (InferenceRequestHandler,), {'classifier': classifier, 'pool': pool})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_background(classifier, host='127.0.0.1', port=0, pool=None):
+    """Serve from a daemon thread; returns (server, base URL)"""
+    server = make_server(classifier, host, port, pool)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--no-gate', action='store_true', help='serve without the image gate')
+    parser.add_argument('--pool-root', default=None,
+                        help='directory of model variants served as /predict?variant=<id>')
+    parser.add_argument('--pool-budget-mb', type=float, default=512)
+    args = parser.parse_args()
+
+    from face_classification_model import shared_classifier
+    from image_gate import ImageGate
+
+    classifier = shared_classifier()
+    classifier.gate = None if args.no_gate else ImageGate()
+    if classifier.model is None:
+        print("No trained model found; /predict will answer 503")
+    pool = None
+    if args.pool_root:
+        from model_pool import ModelPool
+
+        pool = ModelPool(args.pool_root, args.pool_budget_mb, gate=classifier.gate)
+        print(f"Model variants from {args.pool_root}: {', '.join(pool.variants()) or 'none'}")
+    server = make_server(classifier, args.host, args.port, pool)
+    print(f"Serving predictions at http://{args.host}:{args.port}/predict", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nInference server stopped")
+
+
+if __name__ == "__main__":
+    main()
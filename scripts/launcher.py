@@ -0,0 +1,160 @@
+"""
+Fast launcher shared by run_app.py and run_streamlit.py.
+
+Installed packages are checked against requirements.txt with
+importlib.metadata and pip only runs for what is missing or too old. The
+saved model is loaded and a warmup inference runs before the Streamlit
+server starts, and the server runs in this process so every session shares
+the warm model. Time-to-ready is reported once /_stcore/health answers.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from importlib import metadata
+
+# Time-to-ready is measured from here, i.e. almost from interpreter start
+LAUNCH_STARTED = time.perf_counter()
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REQUIREMENTS_PATH = os.path.join(SCRIPTS_DIR, 'requirements.txt')
+
+REQUIREMENT_PATTERN = re.compile(r'^([A-Za-z0-9_.\-]+)(\[[^\]]*\])?\s*([^;]*)')
+SPECIFIER_PATTERN = re.compile(r'(==|!=|>=|<=|~=|>|<)\s*([^,\s]+)')
+
+
+def version_tuple(version):
+    """Numeric release part of a version string ('1.28.0rc1' -> (1, 28, 0))"""
+    parts = []
+    for part in version.split('.'):
+        digits = re.match(r'\d+', part)
+        if digits is None:
+            break
+        parts.append(int(digits.group()))
+        if digits.group() != part:
+            break
+    return tuple(parts)
+
+
+def satisfies(installed, specifiers):
+    """Check an installed version against [(operator, version)] specifiers"""
+    have = version_tuple(installed)
+    for op, wanted in specifiers:
+        want = version_tuple(wanted)
+        # Compare on equal length so that 1.28 == 1.28.0
+        width = max(len(have), len(want))
+        a, b = have + (0,) * (width - len(have)), want + (0,) * (width - len(want))
+        ok = {
+            '==': a == b, '!=': a != b, '>=': a >= b, '<=': a <= b, '>': a > b, '<': a < b,
+            '~=': a >= b and a[:len(want) - 1] == b[:len(want) - 1],
+        }[op]
+        if not ok:
+            return False
+    return True
+
+
+def missing_requirements(path=REQUIREMENTS_PATH):
+    """Requirement lines from `path` that are not installed in a matching version"""
+    missing = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            match = REQUIREMENT_PATTERN.match(line)
+            if not line or line.startswith('-') or match is None:
+                continue
+            try:
+                installed = metadata.version(match.group(1))
+            except metadata.PackageNotFoundError:
+                missing.append(line)
+                continue
+            if not satisfies(installed, SPECIFIER_PATTERN.findall(match.group(3))):
+                missing.append(line)
+    return missing
+
+
+def ensure_requirements(path=REQUIREMENTS_PATH):
+    """Install only the requirements that are missing or too old"""
+    start = time.perf_counter()
+    missing = missing_requirements(path)
+    if not missing:
+        print(f"✅ Requirements satisfied ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return
+    print(f"📦 Installing {len(missing)} missing package(s): {', '.join(missing)}")
+    subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
+
+
+def prewarm():
+    """Load the model and run a warmup inference in this process"""
+    start = time.perf_counter()
+    from face_classification_model import shared_classifier
+
+    if shared_classifier().model is None:
+        print("⚠️ No trained model found; the app starts without a warm model")
+    else:
+        print(f"🔥 Model loaded and warmed up ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+def report_ready(port, started, address='localhost', timeout=120.0):
+    """Poll the Streamlit health endpoint and print time-to-ready"""
+    from urllib.error import URLError
+    from urllib.request import urlopen
+
+    url = f"http://{address}:{port}/_stcore/health"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    print(f"🚀 Ready at http://{address}:{port} in {time.perf_counter() - started:.2f}s")
+                    return True
+        except (URLError, OSError):
+            pass
+        time.sleep(0.1)
+    print(f"⚠️ Streamlit did not report healthy within {timeout:.0f}s")
+    return False
+
+
+def launch(script, port=8501, address='localhost', install=True, warm=True, started=None):
+    """Check requirements, prewarm the model and serve `script` with Streamlit
+
+    The server runs in this process (via streamlit's CLI entry point), so
+    the warm model in face_classification_model is shared with the app.
+    """
+    started = LAUNCH_STARTED if started is None else started
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    if install:
+        ensure_requirements()
+    if warm:
+        prewarm()
+
+    threading.Thread(target=report_ready, args=(port, started, address), daemon=True).start()
+
+    from streamlit.web import cli as stcli
+
+    sys.argv = [
+        "streamlit", "run", os.path.join(SCRIPTS_DIR, script),
+        "--server.port", str(port),
+        "--server.address", address,
+    ]
+    stcli.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('script', nargs='?', default='streamlit_face_app.py',
+                        help='Streamlit app in the scripts directory')
+    parser.add_argument('--port', type=int, default=8501)
+    parser.add_argument('--address', default='localhost')
+    parser.add_argument('--skip-install', action='store_true', help='do not check requirements')
+    parser.add_argument('--no-prewarm', action='store_true', help='do not load the model before serving')
+    args = parser.parse_args()
+
+    launch(args.script, args.port, args.address, not args.skip_install, not args.no_prewarm)
+
+
+if __name__ == "__main__":
+    main()
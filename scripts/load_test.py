@@ -0,0 +1,329 @@
+"""
+Load generator for the prediction path.
+
+Drives JiabaoFaceClassifier.predict in-process, or an HTTP endpoint
+(inference_server.py, started locally with --spawn-server), with a fixed
+concurrency and either closed-loop requests or an open-loop arrival rate.
+Uploads follow a configurable image-size mix. Reports throughput,
+p50/p95/p99 latency, error rate and CPU/RSS of the serving process over
+time, writes everything to a JSON file and can compare it with an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmark_suite import RESULTS_DIR, upload_bytes
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+VARIANTS_PER_SIZE = 8
+
+
+def parse_size_mix(spec):
+    """'640x480:0.7,1280x960:0.3' -> [((640, 480), 0.7), ((1280, 960), 0.3)]"""
+    mix = []
+    for part in spec.split(','):
+        size, _, weight = part.partition(':')
+        width, height = (int(v) for v in size.lower().split('x'))
+        mix.append(((width, height), float(weight or 1)))
+    return mix
+
+
+class ProcessSampler:
+    """Samples CPU % and RSS of one process from /proc (Linux)"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self._last = None
+
+    def sample(self):
+        """(cpu %, rss MB) since the previous call; None when /proc is unavailable"""
+        try:
+            with open(f'/proc/{self.pid}/stat', 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/statm', 'r') as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return None
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / self.ticks
+        now = time.perf_counter()
+        cpu_percent = None
+        if self._last is not None:
+            cpu_percent = 100 * (cpu_seconds - self._last[1]) / max(now - self._last[0], 1e-9)
+        self._last = (now, cpu_seconds)
+        return cpu_percent, rss_pages * self.page_size / 1e6
+
+
+def in_process_target(gate=False):
+    """Callable that runs one prediction in this process"""
+    import io
+    from face_classification_model import shared_classifier
+    from image_gate import ImageGate
+
+    classifier = shared_classifier()
+    classifier.gate = ImageGate() if gate else None
+    if classifier.model is None:
+        sys.exit("No trained model in the working directory; train one first")
+
+    def send(data):
+        result = classifier.predict(io.BytesIO(data))
+        return 'error' not in result
+    return send
+
+
+def http_target(url):
+    """Callable that POSTs one image to `url`/predict"""
+    import requests
+
+    session = threading.local()
+
+    def send(data):
+        if not hasattr(session, 'value'):
+            session.value = requests.Session()
+        response = session.value.post(f'{url}/predict', data=data,
+                                      headers={'Content-Type': 'application/octet-stream'}, timeout=60)
+        return response.status_code == 200
+    return send
+
+
+def spawn_server(port, gate=False):
+    """Start inference_server.py in a subprocess and wait for /health"""
+    import requests
+
+    command = [sys.executable, os.path.join(SCRIPTS_DIR, 'inference_server.py'), '--port', str(port)]
+    if not gate:
+        command.append('--no-gate')
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("inference_server.py exited during startup")
+        try:
+            if requests.get(f'{url}/health', timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    sys.exit("inference_server.py did not become healthy within 60 s")
+
+
+def run_load(send, payloads, concurrency, duration, rate, sampler, interval, seed=0):
+    """Run the load and return (samples, timeseries, elapsed seconds)
+
+    Each sample is (size label, latency ms, ok, finish time). With `rate` > 0
+    requests arrive as a Poisson process and latency is measured from the
+    scheduled arrival, so queueing delay counts (no coordinated omission);
+    otherwise every worker sends its next request as soon as the previous
+    one returns.
+    """
+    rng = random.Random(seed)
+    labels = list(payloads)
+    weights = [payloads[label]['weight'] for label in labels]
+    samples, lock = [], threading.Lock()
+    stop_at = time.perf_counter() + duration
+    arrivals = queue.Queue()
+
+    def pick():
+        with lock:
+            label = rng.choices(labels, weights)[0]
+            return label, rng.choice(payloads[label]['data'])
+
+    def one(label, data, started):
+        try:
+            ok = send(data)
+        except Exception:
+            ok = False
+        with lock:
+            samples.append((label, (time.perf_counter() - started) * 1000, ok, time.perf_counter()))
+
+    def closed_worker():
+        while time.perf_counter() < stop_at:
+            label, data = pick()
+            one(label, data, time.perf_counter())
+
+    def open_worker():
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            one(*item)
+
+    def scheduler():
+        next_at = time.perf_counter()
+        while next_at < stop_at:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            label, data = pick()
+            arrivals.put((label, data, next_at))
+            next_at += rng.expovariate(rate)
+        for _ in range(concurrency):
+            arrivals.put(None)
+
+    threads = [threading.Thread(target=open_worker if rate else closed_worker, daemon=True)
+               for _ in range(concurrency)]
+    if rate:
+        threads.append(threading.Thread(target=scheduler, daemon=True))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # Sample throughput, latency and process resources while the load runs
+    timeseries = []
+    if sampler:
+        sampler.sample()
+    seen = 0
+    while any(thread.is_alive() for thread in threads):
+        time.sleep(interval)
+        with lock:
+            window = samples[seen:]
+            seen = len(samples)
+        resources = sampler.sample() if sampler else None
+        latencies = [latency for _, latency, _, _ in window]
+        timeseries.append({
+            't_s': round(time.perf_counter() - start, 3),
+            'completed': seen,
+            'rps': len(window) / interval,
+            'p95_ms': float(np.percentile(latencies, 95)) if latencies else None,
+            'errors': sum(1 for _, _, ok, _ in window if not ok),
+            'cpu_percent': resources[0] if resources else None,
+            'rss_mb': resources[1] if resources else None,
+        })
+    # Elapsed up to the last completion, not up to the last sampling tick
+    end = max((finished for _, _, _, finished in samples), default=time.perf_counter())
+    return samples, timeseries, end - start
+
+
+def summarize(samples, elapsed):
+    """Throughput, error rate and latency percentiles for a list of samples"""
+    if not samples:
+        return {'requests': 0}
+    latencies = np.array([latency for _, latency, _, _ in samples])
+    errors = sum(1 for _, _, ok, _ in samples if not ok)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples),
+        'throughput_rps': len(samples) / elapsed,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(latencies.max()),
+    }
+
+
+def compare(summary, baseline):
+    """Print the change of the headline numbers against an earlier report"""
+    reference = baseline.get('summary', {})
+    for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'error_rate'):
+        if reference.get(key) is None or summary.get(key) is None:
+            continue
+        before, after = reference[key], summary[key]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {key:<16} {before:>10.2f} -> {after:>10.2f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['inprocess', 'http'], default='inprocess')
+    parser.add_argument('--url', default=None, help='base URL of a running inference server (http mode)')
+    parser.add_argument('--spawn-server', action='store_true',
+                        help='start inference_server.py locally (http mode, no --url)')
+    parser.add_argument('--port', type=int, default=8600, help='port for --spawn-server')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=0,
+                        help='open-loop arrival rate in requests/s (0 = closed loop)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--sizes', default='640x480:0.6,1280x960:0.3,2048x1536:0.1',
+                        help='image size mix as WxH:weight,...')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between timeseries samples')
+    parser.add_argument('--output', default=None, help='results JSON (default: timestamped file)')
+    parser.add_argument('--compare', default=None, help='earlier results JSON to compare with')
+    parser.add_argument('--gate', action='store_true',
+                        help='put the image gate in front of predict, as the apps do')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    payloads = {}
+    for (width, height), weight in parse_size_mix(args.sizes):
+        payloads[f'{width}x{height}'] = {
+            'weight': weight,
+            'data': [upload_bytes(args.seed + i, (width, height)) for i in range(VARIANTS_PER_SIZE)],
+        }
+
+    server = None
+    if args.mode == 'inprocess':
+        send, pid = in_process_target(args.gate), os.getpid()
+    elif args.url:
+        send, pid = http_target(args.url.rstrip('/')), None
+    elif args.spawn_server:
+        server, url = spawn_server(args.port, args.gate)
+        send, pid = http_target(url), server.pid
+    else:
+        parser.error("http mode needs --url or --spawn-server")
+
+    sampler = ProcessSampler(pid) if pid and os.path.exists(f'/proc/{pid}') else None
+    print(f"Running {args.duration:.0f}s of {args.mode} load, concurrency {args.concurrency}, "
+          f"{f'{args.rate:g} req/s' if args.rate else 'closed loop'}...")
+    try:
+        samples, timeseries, elapsed = run_load(send, payloads, args.concurrency, args.duration,
+                                                args.rate, sampler, args.interval, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(samples, elapsed)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'summary': summary,
+        'by_size': {label: summarize([s for s in samples if s[0] == label], elapsed) for label in payloads},
+        'timeseries': timeseries,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{summary['requests']} requests in {elapsed:.1f}s")
+    if summary['requests']:
+        print(f"  throughput  {summary['throughput_rps']:.1f} req/s")
+        print(f"  latency     p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, "
+              f"p99 {summary['p99_ms']:.1f} ms")
+        print(f"  errors      {summary['errors']} ({summary['error_rate']:.2%})")
+    peak_rss = max((point['rss_mb'] for point in timeseries if point['rss_mb'] is not None), default=None)
+    if peak_rss is not None:
+        print(f"  peak RSS    {peak_rss:.0f} MB")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare}:")
+        compare(summary, baseline)
+
+
+if __name__ == "__main__":
+    main()
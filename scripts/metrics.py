@@ -0,0 +1,127 @@
+"""
+Low-overhead latency histograms and counters for the prediction path.
+
+Each stage keeps its last `window` samples in a fixed numpy ring buffer, so
+recording is an array store and percentiles are only computed when a snapshot
+is taken. Snapshots are exported to a JSON file that the dashboard (or any
+other process) can read.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+METRICS_PATH = 'metrics.json'
+EXPORT_INTERVAL = 5.0
+
+
+class RollingHistogram:
+    def __init__(self, window=2048):
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        """count, mean and p50/p95/p99 over the rolling window (in ms)"""
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return {'count': 0}
+        p50, p95, p99 = np.percentile(filled, [50, 95, 99])
+        return {
+            'count': self.count,
+            'mean_ms': float(filled.mean()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, window=2048, path=METRICS_PATH, export_interval=EXPORT_INTERVAL):
+        self.window = window
+        self.path = path
+        self.export_interval = export_interval
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+        self._last_export = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, stage, ms):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = RollingHistogram(self.window)
+            histogram.record(ms)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, stage):
+        """Record the wall time of the block under `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def mean(self, stage):
+        """Mean of every sample recorded under `stage` (0.0 before the first)"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            return histogram.total / histogram.count if histogram is not None and histogram.count else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'updated': time.time(),
+                'uptime_s': time.time() - self.started,
+                'stages': {stage: h.summary() for stage, h in self.histograms.items()},
+                'counters': dict(self.counters),
+            }
+
+    def export(self, path=None):
+        """Atomically write the current snapshot as JSON"""
+        path = path or self.path
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+        self._last_export = time.time()
+
+    def maybe_export(self):
+        """Export at most once per `export_interval` seconds"""
+        if self.path and time.time() - self._last_export >= self.export_interval:
+            try:
+                self.export()
+            except OSError as e:
+                print(f"Could not export metrics: {e}")
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+
+def load_exported(path=METRICS_PATH):
+    """Read a snapshot exported by another process, or None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Process-wide registry shared by every classifier instance and Streamlit session
+METRICS = MetricsRegistry()
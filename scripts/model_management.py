@@ -1,15 +1,122 @@
 """
 Tool untuk manage model dan database
 """
+import codecs
+import csv
+import json
 import os
-import joblib
-import pandas as pd
 from datetime import datetime
-from face_classification_model import JiabaoFaceClassifier
+
+REQUIRED_COLUMNS = ['FotoCS', 'pixel_features', 'kadar minyak', 'kadar air', 'ukuran pori', 'Tekstur Kulit']
+PREVIEW_CHUNK_SIZE = 1 << 16
+
+
+class CsvPreview:
+    """Header dan beberapa baris pertama CSV, dibaca tanpa mengunduh sisanya
+    
+    Untuk URL, setiap byte yang diterima langsung ditulis ke cache, sehingga
+    complete() cukup melanjutkan stream yang sama dan dataset hanya diunduh
+    sekali untuk validasi + training. Cache yang ETag-nya masih cocok dengan
+    server dibaca dari disk tanpa mengunduh ulang.
+    """
+    def __init__(self, source, sample_rows=100, cache_dir='data_cache'):
+        self.source = source
+        self._file = self._response = self._part = None
+        self.etag = None
+        if os.path.exists(source):
+            self.path = source
+        else:
+            self._open_remote(cache_dir)
+        
+        if self._response is None:
+            self.size = os.path.getsize(self.path)
+            # utf-8-sig: Excel exports start with a BOM, which pandas skips as well
+            self._file = open(self.path, 'r', encoding='utf-8-sig', newline='')
+            lines = self._file
+        else:
+            lines = self._stream_lines()
+        
+        # Satu baris pixel_features bisa melebihi batas default modul csv
+        csv.field_size_limit(max(csv.field_size_limit(), 1 << 24))
+        reader = csv.reader(lines)
+        self.columns = next(reader, [])
+        self.rows = []
+        for row in reader:
+            self.rows.append(dict(zip(self.columns, row)))
+            if len(self.rows) >= sample_rows:
+                break
+    
+    def _open_remote(self, cache_dir):
+        """Mulai unduhan, kecuali cache masih sama dengan versi di server (ETag)"""
+        from photo_ingestion import open_remote
+        
+        self.path, response = open_remote(self.source, cache_dir)
+        if response is None:
+            return
+        self._response = response
+        self.etag = response.headers.get('ETag')
+        self.size = int(response.headers.get('Content-Length', 0)) or None
+        self._chunks = response.iter_content(chunk_size=PREVIEW_CHUNK_SIZE)
+        self._part = open(self.path + '.part', 'wb')
+    
+    def _stream_lines(self):
+        """Baris teks dari response; chunk disimpan ke cache sebelum diparse"""
+        decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        pending = ''
+        for chunk in self._chunks:
+            self._part.write(chunk)
+            pending += decoder.decode(chunk)
+            lines = pending.splitlines(keepends=True)
+            pending = lines.pop() if lines and not lines[-1].endswith('\n') else ''
+            yield from lines
+        pending += decoder.decode(b'', final=True)
+        if pending:
+            yield pending
+    
+    def complete(self):
+        """Path lokal CSV lengkap; sisa unduhan dilanjutkan dari stream yang sama"""
+        from photo_ingestion import store_download
+        
+        try:
+            if self._part is not None:
+                print("⬇️ Melanjutkan unduhan dataset...")
+                for chunk in self._chunks:
+                    self._part.write(chunk)
+                self._part.close()
+                self._part = None
+                store_download(self.path, self.etag)
+        finally:
+            # Saat unduhan gagal, close() juga menutup dan menghapus file .part
+            self.close()
+        return self.path
+    
+    def close(self):
+        """Tutup stream; unduhan yang belum selesai dibuang"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+        if self._part is not None:
+            self._part.close()
+            self._part = None
+            os.remove(self.path + '.part')
+
 
 class ModelManager:
     def __init__(self):
-        self.classifier = JiabaoFaceClassifier()
+        self._classifier = None
+        # Preview CSV yang lolos validasi, dipakai ulang oleh train_new_model
+        self._validated = {}
+    
+    @property
+    def classifier(self):
+        """Classifier dibuat saat pertama dipakai agar operasi ringan tetap cepat"""
+        if self._classifier is None:
+            from face_classification_model import JiabaoFaceClassifier
+            self._classifier = JiabaoFaceClassifier()
+        return self._classifier
     
     def backup_current_model(self):
         """Backup model yang sedang digunakan"""
@@ -25,37 +132,63 @@ class ModelManager:
         if backup_old:
             self.backup_current_model()
         
+        preview = self._validated.pop(csv_url, None)
+        if preview is not None:
+            csv_url = preview.complete()
+        
         print("🔄 Training model baru...")
         accuracy = self.classifier.train_model(csv_url)
         
         return accuracy
     
-    def validate_csv_format(self, csv_url):
-        """Validasi format CSV sebelum training"""
+    def validate_csv_format(self, csv_url, sample_rows=100):
+        """Validasi format CSV sebelum training
+        
+        Hanya header dan `sample_rows` baris pertama yang dibaca; stream-nya
+        disimpan agar train_new_model tidak mengunduh dataset lagi.
+        """
+        previous = self._validated.pop(csv_url, None)
+        if previous is not None:
+            previous.close()
+        
         try:
-            import requests
-            import io
-            
-            response = requests.get(csv_url)
-            df = pd.read_csv(io.StringIO(response.text))
-            
-            required_columns = ['FotoCS', 'pixel_features', 'kadar minyak', 'kadar air', 'ukuran pori', 'Tekstur Kulit']
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                print(f"❌ Kolom yang hilang: {missing_columns}")
-                return False
-            
-            print("✅ Format CSV valid!")
-            print(f"📊 Jumlah data: {len(df)} samples")
-            print(f"🏷️ Kelas: {df['Tekstur Kulit'].unique()}")
-            
-            return True
-            
+            preview = CsvPreview(csv_url, sample_rows)
         except Exception as e:
             print(f"❌ Error validasi CSV: {e}")
             return False
+        
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in preview.columns]
+        if missing_columns:
+            print(f"❌ Kolom yang hilang: {missing_columns}")
+            preview.close()
+            return False
+        
+        if not preview.rows:
+            print("❌ CSV tidak berisi data")
+            preview.close()
+            return False
+        
+        invalid_rows = 0
+        for row in preview.rows:
+            try:
+                if not isinstance(json.loads(row['pixel_features']), list):
+                    invalid_rows += 1
+            except (TypeError, ValueError):
+                invalid_rows += 1
+        if invalid_rows:
+            print(f"❌ pixel_features tidak valid di {invalid_rows} dari {len(preview.rows)} baris sampel")
+            preview.close()
+            return False
+        
+        classes = sorted({row['Tekstur Kulit'] for row in preview.rows if row.get('Tekstur Kulit')})
+        print("✅ Format CSV valid!")
+        if preview.size:
+            print(f"📦 Ukuran dataset: {preview.size / 1e6:.1f} MB")
+        print(f"📊 Sampel diperiksa: {len(preview.rows)} baris")
+        print(f"🏷️ Kelas (sampel): {classes}")
+        
+        self._validated[csv_url] = preview
+        return True
 
 # Contoh penggunaan
 if __name__ == "__main__":
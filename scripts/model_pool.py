@@ -0,0 +1,228 @@
+"""
+Serve several model variants from one process under a memory budget.
+
+Each variant (per clinic branch, per camera setup, an older version for
+comparison, ...) is a directory under the pool root holding the usual
+face_classifier_model.pkl / feature_scaler.pkl / model_pipeline.pkl. Variants
+are loaded on first use, their in-memory footprint is measured from the
+numpy buffers they hold, and the least recently used ones are evicted when
+the total exceeds the budget. Each routed request is timed end to end into
+the shared metrics registry as pool_cold (the variant had to be loaded) or
+pool_warm (it was already in memory); the load itself is pool_load.
+inference_server.py serves the pool through /predict?variant=<id>.
+"""
+import argparse
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from face_classification_model import MODEL_PATH, JiabaoFaceClassifier
+from metrics import METRICS
+
+VARIANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.\-]*$')
+
+
+def deep_nbytes(obj, seen=None):
+    """Bytes held in numpy arrays reachable from `obj`
+
+    Fitted estimators keep nearly all of their memory in numpy arrays;
+    sklearn's Cython trees expose theirs through __getstate__ without a copy.
+    """
+    # Maps id -> object so temporaries (e.g. __getstate__ dicts) stay alive
+    # and their ids cannot be reused during the walk
+    seen = {} if seen is None else seen
+    if id(obj) in seen or obj is None or isinstance(obj, (str, bytes, int, float, bool)):
+        return 0
+    seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return obj.nbytes + sum(deep_nbytes(item, seen) for item in obj.ravel())
+        if isinstance(obj.base, np.ndarray):
+            # A view: count the array that owns the memory, once
+            return deep_nbytes(obj.base, seen)
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(deep_nbytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(deep_nbytes(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return deep_nbytes(vars(obj), seen)
+    try:
+        state = obj.__getstate__()
+    except (AttributeError, TypeError):
+        return 0
+    return deep_nbytes(state, seen) if isinstance(state, dict) else 0
+
+
+class _Entry:
+    def __init__(self, classifier, nbytes, load_ms):
+        self.classifier = classifier
+        self.nbytes = nbytes
+        self.load_ms = load_ms
+        self.hits = 0
+
+
+class ModelPool:
+    def __init__(self, root='models', memory_budget_mb=512, metrics=None, **classifier_kwargs):
+        self.root = root
+        self.memory_budget = memory_budget_mb * 1e6
+        self.metrics = metrics if metrics is not None else METRICS
+        self.classifier_kwargs = classifier_kwargs
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.evictions = 0
+
+    def variants(self):
+        """Variant IDs available under the pool root"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if VARIANT_ID_PATTERN.match(name)
+                      and os.path.exists(os.path.join(self.root, name, MODEL_PATH)))
+
+    def _variant_dir(self, variant_id):
+        if not VARIANT_ID_PATTERN.match(variant_id):
+            raise KeyError(f"Invalid model variant: {variant_id!r}")
+        path = os.path.join(self.root, variant_id)
+        if not os.path.exists(os.path.join(path, MODEL_PATH)):
+            raise KeyError(f"Unknown model variant: {variant_id!r}")
+        return path
+
+    def memory_used(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, variant_id):
+        """Classifier for `variant_id`, loading it (and evicting others) if needed
+
+        Raises KeyError for an invalid or unknown variant and RuntimeError
+        when the variant's model cannot be loaded.
+        """
+        return self._acquire(variant_id)[0]
+
+    def _acquire(self, variant_id):
+        """(classifier, True if it was already loaded) for `variant_id`"""
+        with self._lock:
+            entry = self._entries.get(variant_id)
+            if entry is not None:
+                self._entries.move_to_end(variant_id)
+                entry.hits += 1
+                self.metrics.increment('pool_hits')
+                return entry.classifier, True
+
+        # Validate before creating a load lock, so bad IDs leave nothing behind
+        variant_dir = self._variant_dir(variant_id)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(variant_id, threading.Lock())
+
+        # One load per variant at a time; warm hits on other variants go on meanwhile
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(variant_id)
+            if entry is not None:
+                # Loaded by another thread while this one waited
+                return self._acquire(variant_id)
+
+            start = time.perf_counter()
+            classifier = JiabaoFaceClassifier(model_dir=variant_dir, metrics=self.metrics,
+                                              **self.classifier_kwargs)
+            if not classifier.warmup():
+                # Not cached, so the next request tries the load again
+                raise RuntimeError(f"Model variant {variant_id!r} could not be loaded")
+            nbytes = deep_nbytes((classifier.model, classifier.scaler, classifier.reducer))
+            load_ms = (time.perf_counter() - start) * 1000
+            self.metrics.observe('pool_load', load_ms)
+            self.metrics.increment('pool_misses')
+
+            with self._lock:
+                self._entries[variant_id] = _Entry(classifier, nbytes, load_ms)
+                self._evict()
+            return classifier, False
+
+    def _evict(self):
+        """Drop least recently used variants until the pool fits the budget"""
+        total = sum(entry.nbytes for entry in self._entries.values())
+        # The most recent variant stays even if it alone exceeds the budget
+        while total > self.memory_budget and len(self._entries) > 1:
+            variant_id, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            self.evictions += 1
+            self.metrics.increment('pool_evictions')
+            print(f"Evicted model variant {variant_id} ({entry.nbytes / 1e6:.1f} MB)")
+
+    def predict(self, variant_id, image_data, **kwargs):
+        """Route one prediction to `variant_id`, timing the whole request"""
+        start = time.perf_counter()
+        classifier, warm = self._acquire(variant_id)
+        result = classifier.predict(image_data, **kwargs)
+        self.metrics.observe('pool_warm' if warm else 'pool_cold', (time.perf_counter() - start) * 1000)
+        return result
+
+    def stats(self):
+        """Loaded variants (LRU first) with footprint, load time and hits"""
+        with self._lock:
+            return {
+                'budget_mb': self.memory_budget / 1e6,
+                'used_mb': sum(entry.nbytes for entry in self._entries.values()) / 1e6,
+                'evictions': self.evictions,
+                'loaded': {
+                    variant_id: {'mb': entry.nbytes / 1e6, 'load_ms': entry.load_ms, 'hits': entry.hits}
+                    for variant_id, entry in self._entries.items()
+                },
+            }
+
+
+def main():
+    import io
+    import random
+
+    from benchmark_suite import upload_bytes
+    from metrics import MetricsRegistry
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', help='directory with one sub-directory per model variant')
+    parser.add_argument('--budget-mb', type=float, default=512)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--skew', type=float, default=1.2,
+                        help='Zipf exponent of the variant popularity (0 = uniform)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    metrics = MetricsRegistry(path=None)
+    pool = ModelPool(args.root, args.budget_mb, metrics=metrics)
+    variants = pool.variants()
+    if not variants:
+        raise SystemExit(f"No model variants under {args.root}")
+
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(len(variants))]
+    image = upload_bytes(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        pool.predict(rng.choices(variants, weights)[0], io.BytesIO(image))
+    elapsed = time.perf_counter() - start
+
+    snapshot = metrics.snapshot()
+    print(f"{args.requests} requests over {len(variants)} variants in {elapsed:.1f}s")
+    for stage in ('pool_cold', 'pool_warm', 'pool_load'):
+        summary = snapshot['stages'].get(stage, {})
+        if summary.get('count'):
+            print(f"  {stage:<10} n={summary['count']:<6} p50 {summary['p50_ms']:8.2f} ms"
+                  f"  p95 {summary['p95_ms']:8.2f} ms")
+    hits = snapshot['counters'].get('pool_hits', 0)
+    misses = snapshot['counters'].get('pool_misses', 0)
+    print(f"  hit rate   {hits / max(hits + misses, 1):.1%}, {pool.evictions} evictions")
+    stats = pool.stats()
+    print(f"  memory     {stats['used_mb']:.1f} / {stats['budget_mb']:g} MB")
+    for variant_id, entry in stats['loaded'].items():
+        print(f"    {variant_id:<20} {entry['mb']:8.1f} MB  {entry['hits']} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Build the training feature matrix straight from the photo ZIP.
+
+The ZIP central directory is read once per process; every member is joined to
+its CSV row through the `FotoCS` column and decoded in parallel worker
+processes, so the CSV only has to carry the small tabular columns. Members
+that are corrupt (CRC mismatch) or use an unsupported compression method are
+skipped with a warning instead of failing the whole build.
+"""
+import os
+import zipfile
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+
+
+def cache_path(source, cache_dir='data_cache'):
+    """Where a remote `source` is cached locally"""
+    name = source.split('/')[-1].split('?')[0] or 'download'
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(cache_dir, f'{digest}_{name}')
+
+
+def open_remote(source, cache_dir='data_cache'):
+    """Revalidate the cached copy of a remote `source` against the server
+
+    Returns (path, response). The response is None when the cached file is
+    still current (the server answered 304 to its stored ETag); otherwise it
+    is an open streaming response whose body belongs at `path` (write it to
+    path + '.part' and call store_download when done).
+    """
+    import requests
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(source, cache_dir)
+    headers = {}
+    if os.path.exists(path) and os.path.exists(path + '.etag'):
+        with open(path + '.etag', 'r', encoding='utf-8') as f:
+            headers['If-None-Match'] = f.read().strip()
+
+    response = requests.get(source, stream=True, headers=headers)
+    if response.status_code == 304:
+        response.close()
+        return path, None
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return path, response
+
+
+def store_download(path, etag):
+    """Move a finished path + '.part' download into place with its ETag"""
+    # Drop the old ETag first so a crash cannot pair it with the new file
+    if os.path.exists(path + '.etag'):
+        os.remove(path + '.etag')
+    os.replace(path + '.part', path)
+    if etag:
+        with open(path + '.etag', 'w', encoding='utf-8') as f:
+            f.write(etag)
+
+
+def fetch_to_cache(source, cache_dir='data_cache'):
+    """Return a local path for `source`; remote URLs are re-downloaded only when changed"""
+    if os.path.exists(source):
+        return source
+
+    path, response = open_remote(source, cache_dir)
+    if response is None:
+        return path
+
+    print(f"Downloading {source}...")
+    try:
+        with response, open(path + '.part', 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+        raise
+    store_download(path, response.headers.get('ETag'))
+    return path
+
+
+def photo_key(name):
+    """Normalise a photo reference (ZIP member or FotoCS value) to a join key"""
+    base = os.path.basename(str(name).strip().replace('\\', '/')).lower()
+    stem, ext = os.path.splitext(base)
+    return stem if ext in IMAGE_EXTENSIONS else base
+
+
+# Each worker process opens the ZIP once, in the pool initializer
+_worker_zip = None
+
+
+def _open_worker_zip(zip_path):
+    global _worker_zip
+    _worker_zip = zipfile.ZipFile(zip_path)
+
+
+def _decode_members(zf, infos):
+    """Decode members into uint8 pixel rows; unreadable members become None"""
+    from face_classification_model import image_to_pixels
+    from PIL import Image
+    import io
+
+    rows = []
+    for info in infos:
+        try:
+            # ZipFile.read checks the CRC and handles every supported method
+            image = Image.open(io.BytesIO(zf.read(info)))
+            rows.append(image_to_pixels(image).ravel())
+        except Exception as e:
+            print(f"Skipping {info.filename}: {e}")
+            rows.append(None)
+    return rows
+
+
+def _decode_chunk(infos):
+    """Worker: decode a chunk of members from the process-wide ZIP handle"""
+    return _decode_members(_worker_zip, infos)
+
+
+class PhotoZipIngestor:
+    def __init__(self, zip_source, workers=None, chunk_size=32, cache_dir='data_cache'):
+        self.zip_path = fetch_to_cache(zip_source, cache_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.members = None
+
+    def index(self):
+        """Read the ZIP central directory once and map photo keys to members"""
+        if self.members is not None:
+            return self.members
+
+        self.members = {}
+        with zipfile.ZipFile(self.zip_path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                # Skip macOS resource forks shipped inside exported archives
+                if '__MACOSX/' in info.filename or os.path.basename(info.filename).startswith('._'):
+                    continue
+                self.members.setdefault(photo_key(info.filename), info)
+
+        print(f"ZIP indexed: {len(self.members)} photos")
+        return self.members
+
+    def match(self, photo_refs):
+        """Join FotoCS values to ZIP members; returns (row positions, members)"""
+        members = self.index()
+        positions, matched = [], []
+        for position, ref in enumerate(photo_refs):
+            info = members.get(photo_key(ref))
+            if info is not None:
+                positions.append(position)
+                matched.append(info)
+        return positions, matched
+
+    def decode(self, infos):
+        """Decode members in parallel into an (n, 64*64*3) uint8 matrix"""
+        from face_classification_model import IMAGE_SIZE
+
+        width, height = IMAGE_SIZE
+        matrix = np.zeros((len(infos), width * height * 3), dtype=np.uint8)
+        ok = np.ones(len(infos), dtype=bool)
+
+        chunks = [infos[i:i + self.chunk_size] for i in range(0, len(infos), self.chunk_size)]
+
+        if self.workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_open_worker_zip,
+                                     initargs=(self.zip_path,)) as executor:
+                results = executor.map(_decode_chunk, chunks)
+                self._fill(results, matrix, ok)
+        else:
+            with zipfile.ZipFile(self.zip_path) as zf:
+                self._fill((_decode_members(zf, chunk) for chunk in chunks), matrix, ok)
+
+        return matrix, ok
+
+    def _fill(self, results, matrix, ok):
+        # Results stream back in chunk order, so rows are written as they arrive
+        row = 0
+        for rows in results:
+            for pixels in rows:
+                if pixels is None:
+                    ok[row] = False
+                else:
+                    matrix[row] = pixels
+                row += 1
+
+    def build(self, photo_refs, store=None):
+        """Return (row positions, pixel matrix) for every FotoCS value found in the ZIP
+
+        With a `FeatureStore`, only photos whose content is not stored yet are
+        decoded, and entries for photos no longer in the ZIP are evicted.
+        """
+        positions, infos = self.match(photo_refs)
+        missing = len(photo_refs) - len(positions)
+        if missing:
+            print(f"Warning: {missing} rows have no matching photo in the ZIP")
+
+        if store is None:
+            matrix, ok = self.decode(infos)
+            positions = np.asarray(positions, dtype=int)[ok]
+            return positions, matrix[ok]
+
+        from feature_store import zip_member_key
+
+        keys = [zip_member_key(info) for info in infos]
+        todo = dict(zip(keys, infos))
+        todo_keys = store.missing(keys)
+        print(f"Feature store: {len(keys) - len(todo_keys)} cached, {len(todo_keys)} to decode")
+
+        matrix, ok = self.decode([todo[key] for key in todo_keys])
+        decoded_keys = [key for key, good in zip(todo_keys, ok) if good]
+        live_keys = [zip_member_key(info) for info in self.index().values()]
+        store.sync(decoded_keys, matrix[ok], live_keys)
+
+        good = [i for i, key in enumerate(keys) if key in store]
+        positions = np.asarray(positions, dtype=int)[good]
+        return positions, store.get_many([keys[i] for i in good])
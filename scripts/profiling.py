@@ -0,0 +1,177 @@
+"""
+Opt-in cProfile and tracemalloc captures for the training and inference hot paths.
+
+Off by default. Set JIABAO_PROFILE_RATE to the share of calls to capture
+(1 = every call, 0.01 = one in a hundred), or call configure() from code.
+Each captured call of a @profiled function writes, under JIABAO_PROFILE_DIR
+(default 'profiles'):
+
+  <name>-<time>-<pid>-<n>.prof       pstats dump (snakeviz, pstats, gprof2dot)
+  <name>-<time>-<pid>-<n>.collapsed  folded stacks for flamegraph.pl / speedscope
+  <name>-<time>-<pid>-<n>.alloc.txt  peak traced memory and top allocation sites
+
+Set JIABAO_PROFILE_MEMORY=0 to skip tracemalloc. Only one capture runs at a
+time; calls made while another capture is active (nested or on other
+threads) run unprofiled.
+"""
+import functools
+import os
+import random
+import threading
+import time
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+
+class Profiler:
+    def __init__(self, rate=0.0, directory=DEFAULT_PROFILE_DIR, memory=True, top=25):
+        self.rate = rate
+        self.directory = directory
+        self.memory = memory
+        self.top = top
+        self._active = threading.Lock()
+        self._count = 0
+
+    def should_capture(self):
+        return self.rate > 0 and (self.rate >= 1 or random.random() < self.rate)
+
+    def run(self, name, fn, *args, **kwargs):
+        """Call `fn`, capturing a profile when sampled and no other capture runs"""
+        if not self.should_capture() or not self._active.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            return self._capture(name, fn, args, kwargs)
+        finally:
+            self._active.release()
+
+    def _capture(self, name, fn, args, kwargs):
+        import cProfile
+        import tracemalloc
+
+        # Leave tracing alone if something else already started it
+        trace = self.memory and not tracemalloc.is_tracing()
+        if trace:
+            tracemalloc.start()
+        elif tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            snapshot, peak = None, None
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            if trace:
+                tracemalloc.stop()
+            try:
+                self._write(name, profile, elapsed, snapshot, peak)
+            except OSError as e:
+                print(f"Could not write profile for {name}: {e}")
+
+    def _write(self, name, profile, elapsed, snapshot, peak):
+        import pstats
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._count += 1
+        base = os.path.join(self.directory,
+                            f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._count}")
+        profile.dump_stats(base + '.prof')
+
+        stats = pstats.Stats(profile).stats
+        with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+            for stack, micros in collapse_stacks(stats):
+                f.write(f"{';'.join(stack)} {micros}\n")
+
+        if snapshot is not None:
+            with open(base + '.alloc.txt', 'w', encoding='utf-8') as f:
+                f.write(f"{name}: {elapsed * 1000:.1f} ms, peak traced memory {peak / 1e6:.1f} MB\n\n")
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    frame = stat.traceback[0]
+                    f.write(f"{stat.size / 1e6:10.2f} MB {stat.count:9d} blocks  "
+                            f"{frame.filename}:{frame.lineno}\n")
+
+
+def frame_label(func):
+    """'function (file.py:line)' for a pstats function key"""
+    filename, lineno, name = func
+    if filename == '~':
+        return name.replace(';', ',')
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ',')
+
+
+def collapse_stacks(stats, max_depth=64):
+    """Fold a pstats call graph into (stack, microseconds) pairs
+
+    cProfile only records caller/callee edges, so time is split along each
+    edge in proportion to its share of the callee's cumulative time (the
+    approximation flameprof uses). Recursion is cut where a function
+    reappears on its own stack.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+    folded = {}
+
+    def walk(func, budget, path):
+        _, _, tt, ct, _ = stats[func]
+        share = budget / ct if ct else 0.0
+        stack = path + (frame_label(func),)
+        micros = int(tt * share * 1e6)
+        if micros:
+            folded[stack] = folded.get(stack, 0) + micros
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            label = frame_label(callee)
+            if label not in stack and edge_ct * share > 1e-6:
+                walk(callee, edge_ct * share, stack)
+
+    for root in roots:
+        walk(root, stats[root][3], ())
+    return sorted(folded.items())
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+PROFILER = Profiler(
+    rate=_env_float('JIABAO_PROFILE_RATE', 0.0),
+    directory=os.environ.get('JIABAO_PROFILE_DIR', DEFAULT_PROFILE_DIR),
+    memory=os.environ.get('JIABAO_PROFILE_MEMORY', '1') != '0',
+    top=int(_env_float('JIABAO_PROFILE_TOP', 25)),
+)
+
+
+def configure(rate=None, directory=None, memory=None, top=None):
+    """Change the process-wide profiling settings at runtime"""
+    if rate is not None:
+        PROFILER.rate = rate
+    if directory is not None:
+        PROFILER.directory = directory
+    if memory is not None:
+        PROFILER.memory = memory
+    if top is not None:
+        PROFILER.top = top
+
+
+def profiled(name):
+    """Decorator: capture sampled calls under `name`; a rate check when disabled"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Nested calls inside a capture are already part of its profile
+            if not PROFILER.rate or PROFILER._active.locked():
+                return fn(*args, **kwargs)
+            return PROFILER.run(name, fn, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,11 +1,8 @@
-import subprocess
-import sys
-import os
+import time
 
-def install_requirements():
-    """Install required packages"""
-    print("Installing required packages...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+STARTED = time.perf_counter()
+
+from launcher import launch
 
 def run_streamlit():
     """Run the Streamlit application"""
@@ -14,20 +11,11 @@ def run_streamlit():
     print("📊 Menggunakan Random Forest Algorithm")
     print("🌐 Aplikasi akan terbuka di browser...")
     
-    # Run streamlit app
-    subprocess.run([
-        sys.executable, "-m", "streamlit", "run", 
-        "streamlit_face_app.py",
-        "--server.port", "8501",
-        "--server.address", "localhost"
-    ])
+    # Only missing requirements are installed; the model is warmed up before serving
+    launch("streamlit_face_app.py", port=8501, address="localhost", started=STARTED)
 
 if __name__ == "__main__":
     try:
-        # Install requirements first
-        install_requirements()
-        
-        # Run the app
         run_streamlit()
         
     except KeyboardInterrupt:
@@ -1,12 +1,14 @@
 import subprocess
-import sys
-import os
+import time
+
+STARTED = time.perf_counter()
+
+from launcher import ensure_requirements, launch
 
 def install_requirements():
-    """Install required packages"""
+    """Install required packages that are missing"""
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "scripts/requirements.txt"])
-        print("✅ Requirements installed successfully!")
+        ensure_requirements()
     except subprocess.CalledProcessError as e:
         print(f"❌ Error installing requirements: {e}")
         return False
@@ -19,12 +21,7 @@ def run_streamlit():
         print("📱 The app will open in your browser at http://localhost:8501")
         print("🛑 Press Ctrl+C to stop the server")
         
-        subprocess.run([
-            sys.executable, "-m", "streamlit", "run", 
-            "scripts/streamlit_app.py",
-            "--server.port=8501",
-            "--server.address=localhost"
-        ])
+        launch("streamlit_app.py", port=8501, address="localhost", install=False, started=STARTED)
     except KeyboardInterrupt:
         print("\n👋 Streamlit server stopped.")
     except Exception as e:
@@ -34,7 +31,7 @@ if __name__ == "__main__":
     print("🏥 Jiabao Klinik - Face Classification System")
     print("=" * 50)
     
-    # Install requirements first
+    # Install missing requirements first
     if install_requirements():
         # Run the Streamlit app
         run_streamlit()
@@ -0,0 +1,83 @@
+"""
+Image-derived estimates of kadar minyak, kadar air and ukuran pori.
+
+All statistics are computed with OpenCV on a whole batch at once: the batch is
+stacked into one tall image so every cv2 call runs a single time per batch
+instead of once per photo. Estimates are computed on the same 64x64 RGB image
+the pixel features come from, so training and serving see identical values.
+"""
+import cv2
+import numpy as np
+
+# Specular highlights: very bright, nearly unsaturated pixels (HSV, 0-255)
+SPECULAR_MIN_VALUE = 220
+SPECULAR_MAX_SATURATION = 40
+SPECULAR_GAIN = 12.0
+
+# Texture scale for the moisture estimate (std of the Laplacian response)
+ROUGHNESS_SCALE = 20.0
+
+# Pores show up as small dark blobs; at 64x64 they are one or two pixels wide
+PORE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+PORE_CONTRAST = 12
+# Blob density (blobs per pixel) thresholds between kecil / sedang / besar
+PORE_DENSITY_BINS = (0.004, 0.012)
+# A closing reads two kernel radii away, so each image is padded by that much
+# before stacking; the filter then never sees the neighbouring image
+PORE_PAD = 2 * (PORE_KERNEL.shape[0] // 2)
+
+
+def estimate_skin_measurements(images):
+    """Estimate measurements for an (n, h, w, 3) uint8 RGB batch
+
+    Returns an (n, 3) float array of [kadar_minyak, kadar_air, ukuran_pori],
+    with the first two in [0, 1] and ukuran_pori encoded 0=kecil, 1=sedang,
+    2=besar like the training data.
+    """
+    images = np.ascontiguousarray(images, dtype=np.uint8)
+    if images.ndim == 3:
+        images = images[np.newaxis]
+    n, h, w, _ = images.shape
+    tall = images.reshape(n * h, w, 3)
+
+    # Oil: share of specular highlight pixels
+    hsv = cv2.cvtColor(tall, cv2.COLOR_RGB2HSV).reshape(n, h, w, 3)
+    specular = (hsv[..., 2] >= SPECULAR_MIN_VALUE) & (hsv[..., 1] <= SPECULAR_MAX_SATURATION)
+    kadar_minyak = 1.0 - np.exp(-SPECULAR_GAIN * specular.mean(axis=(1, 2)))
+
+    # Moisture: hydrated skin is smooth (weak Laplacian) and evenly lit.
+    # Border rows are dropped because they touch the neighbouring image.
+    gray = cv2.cvtColor(tall, cv2.COLOR_RGB2GRAY)
+    laplacian = cv2.Laplacian(gray, cv2.CV_32F, ksize=3).reshape(n, h, w)[:, 1:-1, 1:-1]
+    smoothness = 1.0 / (1.0 + laplacian.std(axis=(1, 2)) / ROUGHNESS_SCALE)
+    evenness = 1.0 - np.minimum(gray.reshape(n, h, w).std(axis=(1, 2)) / 128.0, 1.0)
+    kadar_air = 0.6 * smoothness + 0.4 * evenness
+
+    # Pores: dark blobs from a black-hat filter, counted per image. Every
+    # image gets the same reflected border whether it is alone or in a batch
+    # (numpy's 'symmetric' mode is cv2.BORDER_REFLECT)
+    padded_h = h + 2 * PORE_PAD
+    padded = np.pad(gray.reshape(n, h, w), ((0, 0), (PORE_PAD, PORE_PAD), (0, 0)), mode='symmetric')
+    blackhat = cv2.morphologyEx(padded.reshape(n * padded_h, w), cv2.MORPH_BLACKHAT, PORE_KERNEL)
+    mask = (blackhat > PORE_CONTRAST).reshape(n, padded_h, w)
+    # Blank the borders so blobs never join across two stacked images
+    mask[:, :PORE_PAD, :] = False
+    mask[:, -PORE_PAD:, :] = False
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.reshape(n * padded_h, w).astype(np.uint8), connectivity=8)
+    owners = stats[1:count, cv2.CC_STAT_TOP] // padded_h
+    density = np.bincount(owners, minlength=n) / float(h * w)
+    ukuran_pori = np.digitize(density, PORE_DENSITY_BINS)
+
+    return np.column_stack([kadar_minyak, kadar_air, ukuran_pori]).astype(np.float64)
+
+
+def estimate_from_pixel_rows(rows, image_size=(64, 64), batch_size=512):
+    """Estimate measurements for flattened RGB pixel rows (the training matrix)"""
+    width, height = image_size
+    rows = np.asarray(rows)
+    result = np.zeros((len(rows), 3))
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size, :width * height * 3]
+        images = np.clip(batch, 0, 255).astype(np.uint8).reshape(-1, height, width, 3)
+        result[start:start + batch_size] = estimate_skin_measurements(images)
+    return result
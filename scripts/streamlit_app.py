@@ -1,11 +1,11 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from PIL import Image
-import io
 import time
+from PIL import Image
 from datetime import datetime
-import random
+from face_classification_model import BACKEND_LABELS, shared_classifier
+from analysis_log import AnalysisLog
+from image_gate import ImageGate
 
 # Set page config
 st.set_page_config(
@@ -73,44 +73,71 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def simulate_random_forest_classification(image):
-    """Simulate Random Forest classification for skin type"""
-    # Simulate processing time
+SKIN_TYPES = {
+    'dry': {"class": "Dry", "label": "Kulit Kering"},
+    'normal': {"class": "Normal", "label": "Kulit Normal"},
+    'oily': {"class": "Oily", "label": "Kulit Berminyak"},
+}
+
+# Status shown after each engine stage (see PREDICT_STAGES) completes;
+# {model} is the label of the loaded backend
+STATUS_AFTER_STAGE = {
+    'decode': 'Mengekstrak fitur wajah...',
+    'features': 'Menjalankan {model}...',
+    'scale': 'Menjalankan {model}...',
+    'forest': 'Menyelesaikan analisis...',
+}
+
+def model_label(classifier):
+    """Nama backend model yang sedang dimuat"""
+    return BACKEND_LABELS.get(classifier.backend, classifier.backend)
+
+@st.cache_resource
+def get_analysis_log():
+    """Satu log analisis untuk semua sesi; sumber statistik di kolom samping"""
+    return AnalysisLog()
+
+@st.cache_resource
+def get_classifier():
+    """Classifier bersama untuk semua sesi; model dimuat dan di-warmup sekali"""
+    classifier = shared_classifier()
+    classifier.analysis_log = get_analysis_log()
+    # Foto gelap, polos atau terlalu kecil ditolak sebelum model dijalankan
+    classifier.gate = ImageGate()
+    return classifier
+
+def classify_skin(uploaded_file):
+    """Klasifikasi jenis kulit dengan backend model yang sedang dimuat"""
+    classifier = get_classifier()
     progress_bar = st.progress(0)
     status_text = st.empty()
+    status_text.text('Memproses gambar...')
     
-    for i in range(100):
-        progress_bar.progress(i + 1)
-        if i < 30:
-            status_text.text('Memproses gambar...')
-        elif i < 60:
-            status_text.text('Mengekstrak fitur wajah...')
-        elif i < 90:
-            status_text.text('Menjalankan Random Forest...')
-        else:
-            status_text.text('Menyelesaikan analisis...')
-        time.sleep(0.02)
-    
-    # Mock classification results
-    skin_types = [
-        {"class": "Dry", "confidence": random.uniform(0.75, 0.95), "label": "Kulit Kering"},
-        {"class": "Normal", "confidence": random.uniform(0.80, 0.95), "label": "Kulit Normal"},
-        {"class": "Oily", "confidence": random.uniform(0.70, 0.92), "label": "Kulit Berminyak"}
-    ]
+    def on_progress(stage, fraction):
+        # Progress mengikuti tahap yang benar-benar selesai di engine
+        progress_bar.progress(int(fraction * 100))
+        status_text.text(STATUS_AFTER_STAGE[stage].format(model=model_label(classifier)))
     
-    result = random.choice(skin_types)
+    uploaded_file.seek(0)
+    prediction = classifier.predict(uploaded_file, progress=on_progress)
     
     progress_bar.empty()
     status_text.empty()
     
+    if "error" in prediction:
+        return prediction
+    
+    result = dict(SKIN_TYPES.get(prediction["prediction"],
+                                 {"class": prediction["prediction"], "label": prediction["prediction"]}))
+    result["confidence"] = prediction["confidence"]
     return result
 
 def main():
     # Header
-    st.markdown("""
+    st.markdown(f"""
     <div class="main-header">
         <h1>🧠 Jiabao Klinik</h1>
-        <p>Sistem Klasifikasi Jenis Kulit dengan Random Forest Algorithm</p>
+        <p>Sistem Klasifikasi Jenis Kulit dengan {model_label(get_classifier())} Algorithm</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -142,7 +169,13 @@ def main():
                 st.markdown("### 🔍 Proses Analisis")
                 
                 # Run classification
-                result = simulate_random_forest_classification(image)
+                result = classify_skin(uploaded_file)
+                if "rejected" in result:
+                    st.warning(f"⚠️ {result['error']}. Unggah foto wajah yang jelas dengan pencahayaan cukup.")
+                    return
+                if "error" in result:
+                    st.error(f"❌ {result['error']}. Latih model terlebih dahulu (python scripts/face_classification_model.py).")
+                    return
                 
                 # Display results
                 st.markdown("### ✅ Hasil Analisis Jenis Kulit")
@@ -178,9 +211,12 @@ def main():
     with col2:
         st.markdown("### 📊 Tentang Sistem")
         
-        st.markdown("""
+        classifier = get_classifier()
+        accuracy = (f"akurasi {classifier.accuracy:.1%} pada data uji" if classifier.accuracy is not None
+                    else "akurasi belum tercatat")
+        st.markdown(f"""
         **🤖 Algoritma:**
-        Random Forest Classifier dengan akurasi tinggi untuk klasifikasi jenis kulit wajah
+        {model_label(classifier)} Classifier ({accuracy}) untuk klasifikasi jenis kulit wajah
         
         **🔒 Keamanan Data:**
         Semua data pasien dienkripsi dan disimpan sesuai standar keamanan medis
@@ -189,23 +225,30 @@ def main():
         Model telah dilatih dengan ribuan sampel gambar wajah
         """)
         
-        # Statistics (mock data)
+        # Statistics from the persistent analysis log (today only)
+        analysis_log = get_analysis_log()
+        today = time.time()
         st.markdown("### 📈 Statistik Hari Ini")
         col_stat1, col_stat2 = st.columns(2)
         
         with col_stat1:
-            st.metric("Total Analisis", "47", "↑ 12%")
+            st.metric("Total Analisis", f"{analysis_log.total(start=today):,}")
         
         with col_stat2:
-            st.metric("Akurasi Rata-rata", "89.2%", "↑ 2.1%")
+            st.metric("Akurasi Model",
+                      f"{classifier.accuracy:.1%}" if classifier.accuracy is not None else "–")
         
         # Skin type distribution
         st.markdown("### 📊 Distribusi Jenis Kulit")
-        chart_data = pd.DataFrame({
-            'Jenis Kulit': ['Kering', 'Normal', 'Berminyak'],
-            'Jumlah': [15, 20, 12]
-        })
-        st.bar_chart(chart_data.set_index('Jenis Kulit'))
+        distribution = analysis_log.class_distribution(start=today)
+        if distribution:
+            chart_data = pd.DataFrame({
+                'Jenis Kulit': [SKIN_TYPES.get(k, {"label": k})["label"] for k in distribution],
+                'Jumlah': list(distribution.values())
+            })
+            st.bar_chart(chart_data.set_index('Jenis Kulit'))
+        else:
+            st.info("Belum ada analisis hari ini.")
 
 if __name__ == "__main__":
     main()
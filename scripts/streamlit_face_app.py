@@ -1,12 +1,17 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 from PIL import Image
 import io
-import base64
-from face_classification_model import JiabaoFaceClassifier
-import plotly.express as px
-import plotly.graph_objects as go
+import os
+import time
+from datetime import datetime
+from face_classification_model import BACKEND_LABELS, shared_classifier
+from metrics import METRICS
+from analysis_log import AnalysisLog
+from image_gate import ImageGate
+
+# plotly is imported where the charts are drawn, so the header, sidebar and
+# upload form are already on screen before plotly finishes loading
 
 # Page configuration
 st.set_page_config(
@@ -50,18 +55,139 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+DASHBOARD_LABELS = {'dry': 'Kering', 'normal': 'Normal', 'oily': 'Berminyak'}
+
+# Penjelasan singkat per backend untuk tab informasi
+BACKEND_DESCRIPTIONS = {
+    'random_forest': [
+        "Menggunakan ensemble dari multiple decision trees",
+        "Robust terhadap overfitting",
+        "Dapat menangani data dengan dimensi tinggi",
+    ],
+    'extra_trees': [
+        "Ensemble decision trees dengan titik split acak",
+        "Jauh lebih cepat dilatih pada ribuan kolom pixel",
+        "Robust terhadap overfitting",
+    ],
+    'hist_gradient_boosting': [
+        "Membangun pohon dangkal secara bertahap untuk memperbaiki kesalahan sebelumnya",
+        "Fitur dikelompokkan ke 255 bin sehingga training cepat",
+        "Berhenti otomatis (early stopping) saat akurasi validasi tidak naik",
+    ],
+    'logistic_regression': [
+        "Model linear yang sederhana dan sangat cepat",
+        "Probabilitas per kelas mudah ditafsirkan",
+        "Cocok dipadukan dengan tahap PCA",
+    ],
+}
+
+@st.cache_resource
+def get_analysis_log():
+    """Satu log analisis untuk semua sesi; penulisan dibatch di thread terpisah"""
+    return AnalysisLog()
+
+CHART_COLORS = ['#0891b2', '#1e3a8a', '#ec4899']
+
+@st.cache_resource(max_entries=2)
+def dashboard_charts(data_version):
+    """Grafik dashboard; dibangun ulang hanya saat log analisis berubah"""
+    import plotly.express as px
+    
+    analysis_log = get_analysis_log()
+    distribution = analysis_log.class_distribution()
+    trend = analysis_log.monthly_trend()
+    
+    fig_pie = None
+    if distribution:
+        fig_pie = px.pie(values=list(distribution.values()),
+                         names=[DASHBOARD_LABELS.get(k, k) for k in distribution],
+                         color_discrete_sequence=CHART_COLORS)
+    fig_line = None
+    if trend:
+        fig_line = px.line(
+            x=[month for month, _, _ in trend],
+            y=[count for _, _, count in trend],
+            color=[DASHBOARD_LABELS.get(k, k) for _, k, _ in trend],
+            labels={'x': 'Bulan', 'y': 'Jumlah', 'color': 'Jenis Kulit'},
+            color_discrete_sequence=CHART_COLORS,
+        )
+    return fig_pie, fig_line
+
+@st.cache_resource
+def get_classifier():
+    """Satu classifier untuk semua sesi; model dimuat dan di-warmup sekali per proses"""
+    classifier = shared_classifier()
+    classifier.analysis_log = get_analysis_log()
+    # Foto gelap, polos atau terlalu kecil ditolak sebelum model dijalankan
+    classifier.gate = ImageGate()
+    return classifier
+
 # Initialize session state
 if 'classifier' not in st.session_state:
-    st.session_state.classifier = JiabaoFaceClassifier()
+    st.session_state.classifier = get_classifier()
     
 if 'model_trained' not in st.session_state:
-    st.session_state.model_trained = False
+    # A saved model counts as trained; launcher.py loads it before serving
+    st.session_state.model_trained = st.session_state.classifier.model is not None
+
+def expand_uploads(uploaded_files):
+    """[(nama, bytes)] dari foto yang diupload; isi ZIP ikut dibongkar"""
+    import zipfile
+    from photo_ingestion import IMAGE_EXTENSIONS
+    
+    items = []
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(uploaded) as archive:
+                for member in archive.infolist():
+                    name = member.filename
+                    if not member.is_dir() and name.lower().endswith(IMAGE_EXTENSIONS) \
+                            and not os.path.basename(name).startswith('.'):
+                        items.append((f"{uploaded.name}/{name}", archive.read(member)))
+        else:
+            items.append((uploaded.name, uploaded.getvalue()))
+    return items
+
+def batch_row(name, result):
+    """Satu baris tabel hasil batch"""
+    # Waktu proses foto ini sendiri (decode, fitur, bagian dari scale + forest)
+    latency = round(result['latency_ms'], 1) if result.get('latency_ms') is not None else None
+    if "error" in result:
+        return {'File': name, 'Jenis Kulit': '–', 'Kepercayaan': None, 'Waktu (ms)': latency,
+                'Status': result['error']}
+    row = {
+        'File': name,
+        'Jenis Kulit': DASHBOARD_LABELS.get(result['prediction'], result['prediction']),
+        'Kepercayaan': round(result['confidence'], 4),
+    }
+    for label, probability in result['probabilities'].items():
+        row[f"P({DASHBOARD_LABELS.get(label, label)})"] = round(probability, 4)
+    row['Waktu (ms)'] = latency
+    row['Status'] = 'OK'
+    return row
+
+def format_accuracy(accuracy):
+    return f"{accuracy:.1%}" if accuracy is not None else "–"
+
+def format_latency(summary):
+    if not summary.get('count'):
+        return "–"
+    ms = summary['p50_ms']
+    return f"{ms / 1000:.2f}s" if ms >= 1000 else f"{ms:.0f} ms"
+
+metrics_snapshot = METRICS.snapshot()
+total_latency = metrics_snapshot['stages'].get('total', {})
+# All-time count from the persistent log, so it survives restarts
+total_analyses = get_analysis_log().total()
+
+# Label of the loaded backend (saved in model_pipeline.pkl)
+model_label = BACKEND_LABELS.get(st.session_state.classifier.backend, st.session_state.classifier.backend)
 
 # Header
-st.markdown("""
+st.markdown(f"""
 <div class="main-header">
     <h1>🏥 Jiabao Klinik</h1>
-    <h3>Sistem Klasifikasi Jenis Kulit dengan Random Forest</h3>
+    <h3>Sistem Klasifikasi Jenis Kulit dengan {model_label}</h3>
     <p>Analisis profesional untuk menentukan jenis kulit: Kering, Normal, atau Berminyak</p>
 </div>
 """, unsafe_allow_html=True)
@@ -93,12 +219,12 @@ with st.sidebar:
     st.subheader("📈 Statistik Sistem")
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Total Analisis", "1,247")
+        st.metric("Total Analisis", f"{total_analyses:,}")
     with col2:
-        st.metric("Akurasi Model", "92.3%")
+        st.metric("Akurasi Model", format_accuracy(st.session_state.classifier.accuracy))
 
 # Main content
-tab1, tab2, tab3 = st.tabs(["🔍 Analisis Foto", "📊 Dashboard", "ℹ️ Informasi"])
+tab1, tab_batch, tab2, tab3 = st.tabs(["🔍 Analisis Foto", "📁 Analisis Batch", "📊 Dashboard", "ℹ️ Informasi"])
 
 with tab1:
     st.header("Upload dan Analisis Foto Pasien")
@@ -137,7 +263,9 @@ with tab1:
                             # Predict
                             result = st.session_state.classifier.predict(img_bytes)
                             
-                            if "error" in result:
+                            if "rejected" in result:
+                                st.warning(f"⚠️ {result['error']}. Unggah foto wajah yang jelas dengan pencahayaan cukup.")
+                            elif "error" in result:
                                 st.error(f"❌ {result['error']}")
                             else:
                                 st.session_state.analysis_result = result
@@ -185,6 +313,7 @@ with tab1:
             probs = result['probabilities']
             
             # Create bar chart
+            import plotly.express as px
             prob_df = pd.DataFrame([
                 {'Jenis Kulit': skin_type_map.get(k, k), 'Probabilitas': v}
                 for k, v in probs.items()
@@ -208,60 +337,163 @@ with tab1:
             </div>
             """, unsafe_allow_html=True)
 
+with tab_batch:
+    st.header("Analisis Batch")
+    st.write("Unggah beberapa foto atau satu file ZIP (misalnya seri foto satu pasien atau semua foto hari ini).")
+    
+    batch_files = st.file_uploader(
+        "Pilih foto atau ZIP",
+        type=['jpg', 'jpeg', 'png', 'zip'],
+        accept_multiple_files=True,
+        key="batch_uploader",
+    )
+    
+    if batch_files and st.button("🔬 Analisis Semua", type="primary"):
+        if not st.session_state.model_trained:
+            st.error("❌ Model belum dilatih! Silakan latih model terlebih dahulu di sidebar.")
+        else:
+            items = expand_uploads(batch_files)
+            if not items:
+                st.warning("⚠️ Tidak ada foto yang ditemukan.")
+            else:
+                progress_bar = st.progress(0, text=f"0 / {len(items)} foto")
+                table = st.empty()
+                rows = [None] * len(items)
+                done = 0
+                start = time.perf_counter()
+                
+                # Results are shown as each batch finishes, in upload order
+                images = [io.BytesIO(data) for _, data in items]
+                try:
+                    for index, result in st.session_state.classifier.predict_stream(images):
+                        rows[index] = batch_row(items[index][0], result)
+                        # Kapan hasil ini masuk, dihitung dari awal batch
+                        rows[index]['Masuk pada (ms)'] = round((time.perf_counter() - start) * 1000)
+                        done += 1
+                        if done % 8 == 0 or done == len(items):
+                            progress_bar.progress(done / len(items), text=f"{done} / {len(items)} foto")
+                            table.dataframe(pd.DataFrame([row for row in rows if row is not None]),
+                                            use_container_width=True, hide_index=True)
+                except Exception as e:
+                    # Hasil yang sudah selesai tetap disimpan; sisanya ditandai gagal
+                    st.error(f"❌ Error: {str(e)}")
+                    for index, row in enumerate(rows):
+                        if row is None:
+                            rows[index] = batch_row(items[index][0], {"error": f"Gagal: {e}"})
+                
+                st.session_state.batch_result = {
+                    'rows': rows,
+                    'seconds': time.perf_counter() - start,
+                }
+                progress_bar.empty()
+                table.empty()
+    
+    if 'batch_result' in st.session_state:
+        batch = st.session_state.batch_result
+        batch_df = pd.DataFrame(batch['rows'])
+        n_ok = int((batch_df['Status'] == 'OK').sum())
+        
+        latencies = batch_df['Waktu (ms)'].dropna()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Foto dianalisis", f"{n_ok} / {len(batch_df)}")
+        col2.metric("Waktu total", f"{batch['seconds']:.2f}s")
+        col3.metric("Rata-rata per foto", f"{batch['seconds'] * 1000 / max(len(batch_df), 1):.0f} ms")
+        col4.metric("Median waktu proses", f"{latencies.median():.0f} ms" if len(latencies) else "–")
+        
+        st.dataframe(batch_df, use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Unduh hasil (CSV)",
+            batch_df.to_csv(index=False).encode('utf-8'),
+            file_name=f"hasil_batch_{datetime.now():%Y%m%d_%H%M%S}.csv",
+            mime="text/csv",
+        )
+
 with tab2:
     st.header("📊 Dashboard Analisis")
     
-    # Sample data for dashboard
-    sample_data = {
-        'Jenis Kulit': ['Kering', 'Normal', 'Berminyak'] * 100,
-        'Jumlah': np.random.poisson(50, 300),
-        'Bulan': np.random.choice(['Jan', 'Feb', 'Mar', 'Apr', 'Mei'], 300)
-    }
-    df_sample = pd.DataFrame(sample_data)
+    # Refresh so analyses from this rerun are included
+    metrics_snapshot = METRICS.snapshot()
+    total_latency = metrics_snapshot['stages'].get('total', {})
+    total_analyses = get_analysis_log().total()
+    total_predictions = metrics_snapshot['counters'].get('predictions', 0)
+    gate_rejected = metrics_snapshot['counters'].get('gate_rejected', 0)
+    
+    # Analysis history from the persistent log; the figures are cached per
+    # data version, so a rerun without new analyses reuses them as-is
+    fig_pie, fig_line = dashboard_charts(get_analysis_log().data_version())
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
-            <h3>👥 Total Pasien</h3>
-            <h2 style="color: #0891b2;">1,247</h2>
-            <p>+12% dari bulan lalu</p>
+            <h3>👥 Total Analisis</h3>
+            <h2 style="color: #0891b2;">{total_analyses:,}</h2>
+            <p>{metrics_snapshot['counters'].get('errors', 0):,} gagal · {gate_rejected:,} ditolak sejak aplikasi dimulai</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h3>🎯 Akurasi Model</h3>
-            <h2 style="color: #0891b2;">92.3%</h2>
-            <p>Random Forest</p>
+            <h2 style="color: #0891b2;">{format_accuracy(st.session_state.classifier.accuracy)}</h2>
+            <p>{model_label}</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        st.markdown("""
+        p95 = f"p95 {total_latency['p95_ms']:.0f} ms" if total_latency.get('count') else "Belum ada analisis"
+        st.markdown(f"""
         <div class="metric-card">
             <h3>⏱️ Waktu Analisis</h3>
-            <h2 style="color: #0891b2;">2.1s</h2>
-            <p>Rata-rata per foto</p>
+            <h2 style="color: #0891b2;">{format_latency(total_latency)}</h2>
+            <p>Median per foto · {p95}</p>
         </div>
         """, unsafe_allow_html=True)
     
+    # Per-stage latency
+    st.subheader("⏱️ Latensi per Tahap")
+    stage_rows = [
+        {
+            'Tahap': stage,
+            'Jumlah': summary['count'],
+            'p50 (ms)': round(summary['p50_ms'], 2),
+            'p95 (ms)': round(summary['p95_ms'], 2),
+            'p99 (ms)': round(summary['p99_ms'], 2),
+        }
+        for stage, summary in metrics_snapshot['stages'].items() if summary.get('count')
+    ]
+    if stage_rows:
+        st.dataframe(pd.DataFrame(stage_rows), use_container_width=True, hide_index=True)
+    else:
+        st.info("Belum ada data latensi. Lakukan analisis foto terlebih dahulu.")
+    
+    if gate_rejected:
+        counters = metrics_snapshot['counters']
+        share = gate_rejected / (gate_rejected + total_predictions + counters.get('errors', 0))
+        reasons = ", ".join(f"{name[len('gate_'):]} {count:,}" for name, count in sorted(counters.items())
+                            if name.startswith('gate_') and name not in ('gate_rejected', 'gate_saved_ms'))
+        st.caption(f"🚦 {gate_rejected:,} foto ({share:.1%}) ditolak sebelum inferensi ({reasons}), "
+                   f"menghemat ±{counters.get('gate_saved_ms', 0) / 1000:.1f} s komputasi")
+    
     # Charts
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📈 Distribusi Jenis Kulit")
-        skin_dist = df_sample.groupby('Jenis Kulit')['Jumlah'].sum()
-        fig_pie = px.pie(values=skin_dist.values, names=skin_dist.index, color_discrete_sequence=['#0891b2', '#1e3a8a', '#ec4899'])
-        st.plotly_chart(fig_pie, use_container_width=True)
+        if fig_pie is None:
+            st.info("Belum ada riwayat analisis.")
+        else:
+            st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
         st.subheader("📊 Tren Bulanan")
-        monthly_trend = df_sample.groupby(['Bulan', 'Jenis Kulit'])['Jumlah'].sum().reset_index()
-        fig_line = px.line(monthly_trend, x='Bulan', y='Jumlah', color='Jenis Kulit', color_discrete_sequence=['#0891b2', '#1e3a8a', '#ec4899'])
-        st.plotly_chart(fig_line, use_container_width=True)
+        if fig_line is None:
+            st.info("Belum ada riwayat analisis.")
+        else:
+            st.plotly_chart(fig_line, use_container_width=True)
 
 with tab3:
     st.header("ℹ️ Informasi Sistem")
@@ -270,12 +502,11 @@ with tab3:
     
     with col1:
         st.subheader("🤖 Tentang Algoritma")
-        st.markdown("""
-        **Random Forest Classifier** adalah algoritma machine learning yang:
-        - Menggunakan ensemble dari multiple decision trees
-        - Memberikan akurasi tinggi untuk klasifikasi
-        - Robust terhadap overfitting
-        - Dapat menangani data dengan dimensi tinggi
+        traits = "\n".join(f"        - {trait}" for trait in
+                           BACKEND_DESCRIPTIONS.get(st.session_state.classifier.backend, []))
+        st.markdown(f"""
+        **{model_label} Classifier** adalah algoritma machine learning yang:
+{traits}
         
         **Fitur yang Dianalisis:**
         - Pixel features dari foto wajah (RGB values)
@@ -286,17 +517,17 @@ with tab3:
     
     with col2:
         st.subheader("🔒 Keamanan & Privasi")
-        st.markdown("""
+        st.markdown(f"""
         **Perlindungan Data Pasien:**
         - Enkripsi end-to-end untuk semua data
         - Compliance dengan standar HIPAA
-        - Data tidak disimpan setelah analisis
+        - Foto tidak disimpan setelah analisis, hanya hasil klasifikasi
         - Akses terbatas untuk tenaga medis
         
         **Akurasi Model:**
         - Dilatih dengan 1000+ sampel foto
-        - Validasi silang 5-fold
-        - Akurasi rata-rata: 92.3%
+        - Divalidasi pada 20% data yang tidak ikut dilatih
+        - Akurasi pada data uji: {format_accuracy(st.session_state.classifier.accuracy)}
         - Update berkala dengan data baru
         """)
     
@@ -315,9 +546,9 @@ with tab3:
 
 # Footer
 st.markdown("---")
-st.markdown("""
+st.markdown(f"""
 <div style="text-align: center; color: #6b7280; padding: 1rem;">
-    <p>© 2024 Jiabao Klinik - Sistem Klasifikasi Jenis Kulit dengan Random Forest</p>
+    <p>© 2024 Jiabao Klinik - Sistem Klasifikasi Jenis Kulit dengan {model_label}</p>
     <p>Dikembangkan untuk keperluan medis profesional</p>
 </div>
 """, unsafe_allow_html=True)
@@ -0,0 +1,124 @@
+"""
+Synthetic databaseJBC.csv generator for scale testing.
+
+Writes files with exactly the schema ModelManager.validate_csv_format expects
+(FotoCS, pixel_features, kadar minyak, kadar air, ukuran pori, Tekstur Kulit),
+with configurable row count, class balance and missing-value rate, and can
+write the matching photo ZIP. Rows are streamed to disk one at a time, so
+100x the real dataset does not need 100x the memory.
+"""
+import argparse
+import csv
+import io
+import json
+import zipfile
+
+import numpy as np
+from PIL import Image
+
+CLASSES = ['kering', 'normal', 'berminyak']
+PORE_SIZES = ['kecil', 'sedang', 'besar']
+COLUMNS = ['FotoCS', 'pixel_features', 'kadar minyak', 'kadar air', 'ukuran pori', 'Tekstur Kulit']
+# Missing values are only injected into the measurement columns; FotoCS,
+# pixel_features and the label are always present, as in the real export
+MISSABLE_COLUMNS = ['kadar minyak', 'kadar air', 'ukuran pori']
+
+
+def synthetic_image(rng, label_index, size=(64, 64)):
+    """A skin-toned image whose brightness and shine depend on the class
+
+    Lighting falls off across the image in a random direction, as in a real
+    photo. Pixel noise alone averages out when the image is downscaled to
+    64x64, and the image gate would reject the result as blank.
+    """
+    width, height = size
+    base = np.array([200, 160, 140]) + label_index * 12
+    y, x = np.mgrid[0:height, 0:width]
+    angle = rng.uniform(0, 2 * np.pi)
+    lighting = 60 * (np.cos(angle) * (x / width - 0.5) + np.sin(angle) * (y / height - 0.5))
+    image = rng.normal(base, 18, (height, width, 3)) + lighting[..., None]
+    if label_index == 2:
+        patch = max(width, height) // 8
+        y, x = rng.integers(0, height - patch), rng.integers(0, width - patch)
+        image[y:y + patch, x:x + patch] = 250
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def generate_dataset(csv_path, rows, class_balance=(1, 1, 1), missing_rate=0.0,
+                     zip_path=None, photo_size=(256, 256), pixel_features=True, seed=42):
+    """Write a synthetic dataset; returns the number of rows per class
+
+    `class_balance` gives relative weights for kering / normal / berminyak.
+    With `zip_path`, a JPEG per row is written under the FotoCS name and the
+    CSV pixel features are computed from that photo exactly as training does.
+    With `pixel_features=False` only the tabular columns are written.
+    """
+    from face_classification_model import image_to_pixels
+
+    rng = np.random.default_rng(seed)
+    weights = np.asarray(class_balance, dtype=float)
+    labels = rng.choice(len(CLASSES), size=rows, p=weights / weights.sum())
+    columns = COLUMNS if pixel_features else [c for c in COLUMNS if c != 'pixel_features']
+
+    archive = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) if zip_path else None
+    try:
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, lineterminator='\n')
+            writer.writeheader()
+            for i, label in enumerate(labels):
+                name = f'IMG_{i:06d}.jpg'
+                row = {
+                    'FotoCS': name,
+                    'kadar minyak': round(float(rng.uniform(0.2, 0.8)), 3),
+                    'kadar air': round(float(rng.uniform(0.3, 0.7)), 3),
+                    'ukuran pori': PORE_SIZES[rng.integers(0, 3)],
+                    'Tekstur Kulit': CLASSES[label],
+                }
+                for column in MISSABLE_COLUMNS:
+                    if rng.random() < missing_rate:
+                        row[column] = ''
+
+                if archive is not None:
+                    image = Image.fromarray(synthetic_image(rng, label, photo_size))
+                    buffer = io.BytesIO()
+                    image.save(buffer, format='JPEG', quality=90)
+                    archive.writestr(f'Extraksi/{name}', buffer.getvalue())
+                    # Decode the JPEG again so the CSV matches what ingestion sees
+                    pixels = image_to_pixels(Image.open(buffer))
+                else:
+                    pixels = synthetic_image(rng, label)
+                if pixel_features:
+                    row['pixel_features'] = json.dumps(pixels.ravel().tolist())
+
+                writer.writerow(row)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    return {CLASSES[i]: int((labels == i).sum()) for i in range(len(CLASSES))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--balance', type=float, nargs=3, default=[1, 1, 1],
+                        metavar=('KERING', 'NORMAL', 'BERMINYAK'), help='relative class weights')
+    parser.add_argument('--missing-rate', type=float, default=0.0,
+                        help='share of missing values in kadar minyak / kadar air / ukuran pori')
+    parser.add_argument('--zip', default=None, help='also write a matching photo ZIP')
+    parser.add_argument('--photo-size', type=int, nargs=2, default=[256, 256], metavar=('W', 'H'))
+    parser.add_argument('--tabular-only', action='store_true',
+                        help='omit pixel_features (for ZIP-based ingestion)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate_dataset(args.output, args.rows, args.balance, args.missing_rate,
+                              args.zip, tuple(args.photo_size), not args.tabular_only, args.seed)
+    print(f"{args.rows} rows written to {args.output}: {counts}")
+    if args.zip:
+        print(f"Photos written to {args.zip}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,12 @@
 Script untuk update model dengan database baru
 """
 import sys
-from face_classification_model import JiabaoFaceClassifier
 
 def update_model_with_new_data(new_csv_url):
     """Update model dengan database CSV baru"""
     print("🔄 Updating model dengan database baru...")
     
+    from face_classification_model import JiabaoFaceClassifier
     classifier = JiabaoFaceClassifier()
     
     try: